@@ -0,0 +1,191 @@
+import csv
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from itertools import compress, repeat
+from operator import and_, eq, sub
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from atomic import atomic_write
+from models import Action, USERS, Publication, date_text
+from patrons import normalise_user
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOP_N = 50
+PROGRESS_EVERY = 20000
+
+
+class CirculationColumns:
+    # Every history entry of a catalogue as parallel arrays (publication row,
+    # user id, day number, action code), with the publications' own columns
+    # indexed by row. Entries of one publication are adjacent and in history
+    # order. The reports aggregate whole columns at once: with NumPy over
+    # zero-copy views of the arrays when it is installed, otherwise with
+    # Counter, compress and map.
+
+    def __init__(self):
+        self.titles: List[str] = []
+        self.type_names: List[str] = []
+        self.types = array('B')
+        self.borrowed = array('B')
+        self.rows = array('I')
+        self.users = array('I')
+        self.days = array('i')
+        self.actions = array('H')
+
+    # Entries appended to a history while this runs are either all in or all
+    # out: the columns are cut at one length per history.
+    @classmethod
+    def from_publications(cls, pubs: Iterable[Publication], total: int = 0,
+                          progress: Optional[Callable[[float], None]] = None) -> 'CirculationColumns':
+        c = cls()
+        type_codes: Dict[str, int] = {}
+        for row, pub in enumerate(pubs):
+            code = type_codes.get(pub.type)
+            if code is None:
+                code = type_codes[pub.type] = len(c.type_names)
+                c.type_names.append(pub.type)
+            c.titles.append(pub.title)
+            c.types.append(code)
+            c.borrowed.append(not pub.available)
+            h = pub.history
+            n = len(h)
+            if n:
+                c.rows.extend(repeat(row, n))
+                c.users.extend(h.users[:n])
+                c.days.extend(h.days[:n])
+                c.actions.extend(h.actions[:n])
+            if progress is not None and total and row % PROGRESS_EVERY == 0:
+                progress(row / total)
+        return c
+
+    def __len__(self):
+        return len(self.rows)
+
+    # Occurrences of each value of `column` among the borrow entries.
+    def borrow_counts(self, column: array) -> Dict[int, int]:
+        if np is not None:
+            values = np.frombuffer(column, column.typecode)[np.frombuffer(self.actions, 'H') == Action.POSUDBA]
+            keys, counts = np.unique(values, return_counts=True)
+            return dict(zip(keys.tolist(), counts.tolist()))
+        return Counter(compress(column, map(Action.POSUDBA.__eq__, self.actions)))
+
+    # Publications per type name among `rows`.
+    def per_type(self, rows: Iterable[int]) -> Counter:
+        return Counter(map(self.type_names.__getitem__, map(self.types.__getitem__, rows)))
+
+
+@dataclass
+class Report:
+    headers: Tuple[str, ...]
+    rows: List[tuple]
+
+    def write_csv(self, path: str):
+        with atomic_write(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.headers)
+            writer.writerows(self.rows)
+
+
+def loans_per_month(c: CirculationColumns) -> Report:
+    by_month = Counter()
+    for day, n in c.borrow_counts(c.days).items():
+        by_month[date_text(day)[:7] if day > 0 else '?'] += n
+    return Report(('mjesec', 'posudbe'), sorted(by_month.items()))
+
+
+def top_titles(c: CirculationColumns, n: int = TOP_N) -> Report:
+    counts = Counter(c.borrow_counts(c.rows))
+    rows = [(c.titles[row], c.type_names[c.types[row]], loans) for row, loans in counts.most_common(n)]
+    return Report(('naslov', 'tip', 'posudbe'), rows)
+
+
+# Users are counted by pool id first and merged by normalised name after,
+# so the per-entry work stays in the column aggregation.
+def top_borrowers(c: CirculationColumns, n: int = TOP_N) -> Report:
+    by_user = Counter()
+    names = {}
+    for uid, loans in c.borrow_counts(c.users).items():
+        name = USERS[uid]
+        key = normalise_user(name)
+        if key:
+            by_user[key] += loans
+            names.setdefault(key, name)
+    rows = [(names[key], loans) for key, loans in by_user.most_common(n)]
+    return Report(('korisnik', 'posudbe'), rows)
+
+
+# Closed loans as (durations in days, type codes): a return directly after
+# a borrow of the same publication closes that loan. Pairs with a missing
+# or non-ISO date are left out.
+def loan_durations(c: CirculationColumns) -> Tuple[Sequence[int], Sequence[int]]:
+    if len(c) < 2:
+        return array('i'), array('B')
+    if np is not None:
+        rows, days = np.frombuffer(c.rows, 'I'), np.frombuffer(c.days, 'i')
+        actions = np.frombuffer(c.actions, 'H')
+        closes = ((actions[:-1] == Action.POSUDBA) & (actions[1:] == Action.VRACANJE)
+                  & (rows[:-1] == rows[1:]))
+        starts, ends = days[:-1][closes], days[1:][closes]
+        dated = (starts > 0) & (ends > 0)
+        types = np.frombuffer(c.types, 'B')[rows[1:][closes][dated]]
+        return (ends - starts)[dated], types
+    # A loan closes where a borrow is followed by a return on the same row.
+    borrows = map(Action.POSUDBA.__eq__, c.actions[:-1])
+    returns = map(Action.VRACANJE.__eq__, c.actions[1:])
+    closes = list(map(and_, map(and_, borrows, returns), map(eq, c.rows[:-1], c.rows[1:])))
+    starts = array('i', compress(c.days[:-1], closes))
+    ends = array('i', compress(c.days[1:], closes))
+    dated = list(map((0).__lt__, map(min, starts, ends)))
+    rows = compress(compress(c.rows[1:], closes), dated)
+    return list(compress(map(sub, ends, starts), dated)), list(map(c.types.__getitem__, rows))
+
+
+def loan_duration(c: CirculationColumns) -> Report:
+    durations, types = loan_durations(c)
+    k = len(c.type_names)
+    if np is not None:
+        counts = np.bincount(types, minlength=k).tolist()
+        totals = np.bincount(types, weights=durations, minlength=k).astype('int64').tolist()
+    else:
+        counts = [0] * k
+        totals = [0] * k
+        for code in range(k):
+            selected = list(compress(durations, map(code.__eq__, types)))
+            counts[code], totals[code] = len(selected), sum(selected)
+    out = sorted((c.type_names[code], counts[code], round(totals[code] / counts[code], 1))
+                 for code in range(k) if counts[code])
+    if len(durations):
+        out.append(('Ukupno', len(durations), round(int(sum(totals)) / len(durations), 1)))
+    return Report(('tip', 'zatvorene posudbe', 'prosjek (dana)'), out)
+
+
+def type_utilisation(c: CirculationColumns) -> Report:
+    items = c.per_type(range(len(c.types)))
+    borrowed_now = c.per_type(compress(range(len(c.types)), c.borrowed))
+    by_row = c.borrow_counts(c.rows)
+    ever = c.per_type(by_row)
+    loans = Counter()
+    for name, n in zip(map(c.type_names.__getitem__, map(c.types.__getitem__, by_row)), by_row.values()):
+        loans[name] += n
+    rows = []
+    for typ in sorted(items):
+        n = items[typ]
+        rows.append((typ, n, borrowed_now[typ], f'{borrowed_now[typ] / n:.1%}', ever[typ], f'{ever[typ] / n:.1%}',
+                     loans[typ], round(loans[typ] / n, 2)))
+    return Report(('tip', 'publikacija', 'posuđeno sada', 'udio sada', 'ikad posuđeno', 'udio ikad', 'posudbe',
+                   'posudbi po publikaciji'), rows)
+
+
+# Menu label -> report, in menu order.
+REPORTS = {
+    'Posudbe po mjesecima': loans_per_month,
+    'Najposuđivaniji naslovi': top_titles,
+    'Najaktivniji korisnici': top_borrowers,
+    'Prosječno trajanje posudbe': loan_duration,
+    'Iskorištenost po tipu': type_utilisation,
+}
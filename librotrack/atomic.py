@@ -0,0 +1,39 @@
+import os
+from contextlib import contextmanager
+
+
+# Yields a file opened on a temp file next to `path`. On a clean exit the file
+# is fsynced and renamed over `path`; on an error it is removed and `path` is
+# left as it was. shutil and tempfile are imported here, off the core's
+# import path.
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', **kwargs):
+    import shutil
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        with open(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    fsync_dir(directory)
+
+
+def fsync_dir(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
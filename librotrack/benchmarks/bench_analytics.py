@@ -0,0 +1,62 @@
+import sys
+import time
+from collections import Counter
+
+from synthetic import make_catalogue
+
+import analytics
+from analytics import REPORTS, CirculationColumns, loan_durations
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+HISTORY = 10
+# Actions other than borrow and return get codes from 2 up, which no report
+# may take for either.
+ODD_ACTIONS = ('rezervacija', 'produljenje', 'otpis', 'oštećenje', 'inventura')
+
+
+# The per-publication loops the columnar reports replace, to check them on a
+# small catalogue.
+def naive(pubs):
+    months, durations = Counter(), []
+    for p in pubs:
+        entries = list(p.history)
+        for i, e in enumerate(entries):
+            if e['action'] == 'posudba':
+                months[e['date'][:7]] += 1
+                if i + 1 < len(entries) and entries[i + 1]['action'] == 'vraćanje':
+                    durations.append((entries[i + 1]['date'], e['date']))
+    return months, len(durations)
+
+
+def main():
+    small = make_catalogue(2000, history_depth=HISTORY)
+    for i, p in enumerate(small[::3]):
+        p.history.add('Ana Horvat', '2026-01-05', ODD_ACTIONS[i % len(ODD_ACTIONS)])
+    c = CirculationColumns.from_publications(small)
+    months, loans = naive(small)
+    numpy = analytics.np
+    for analytics.np in {numpy, None}:
+        assert dict(REPORTS['Posudbe po mjesecima'](c).rows) == months
+        assert len(loan_durations(c)[0]) == loans
+    analytics.np = numpy
+    if numpy is not None:
+        for report in REPORTS.values():
+            expected = report(c)
+            analytics.np = None
+            assert report(c) == expected, report
+            analytics.np = numpy
+
+    pubs = make_catalogue(N, history_depth=HISTORY)
+    t = time.perf_counter()
+    c = CirculationColumns.from_publications(pubs, len(pubs))
+    print(f'{N} publikacija, {len(c)} zapisa povijesti: stupci {time.perf_counter() - t:.2f}s')
+    for analytics.np in ([numpy, None] if numpy is not None else [None]):
+        print('  NumPy' if analytics.np is not None else '  array / Counter')
+        for label, report in REPORTS.items():
+            t = time.perf_counter()
+            result = report(c)
+            print(f'    {label:<28} {time.perf_counter() - t:6.2f}s  ({len(result.rows)} redaka)')
+
+
+if __name__ == '__main__':
+    main()
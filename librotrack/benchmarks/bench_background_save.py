@@ -0,0 +1,79 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from synthetic import make_catalogue
+from journal import file_token, journal_path, read_journal
+from library import Library
+from tasks import BackgroundTask
+from xml_io import read_catalogue
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+TICK_S = 0.010
+MAX_STALL_S = 0.050
+
+
+def make_library(pubs):
+    library = Library()
+    for p in pubs:
+        library.publications[p.id] = p
+        library.search_index.add(p)
+    library.stats.rebuild(pubs)
+    library.next_id = len(pubs) + 1
+    return library
+
+
+# Stands in for the Tk event loop: a tick every TICK_S, each one a desk
+# action, while a worker thread writes the catalogue. The largest gap between
+# ticks beyond TICK_S is how long the UI would have frozen.
+def main():
+    library = make_library(make_catalogue(N, history_depth=1))
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'katalog.xml')
+    library.save(path)
+    print(f'{N} publikacija, {os.path.getsize(path) / 1e6:.0f} MB')
+
+    rnd = random.Random(7)
+    before = {}
+    saving = library.begin_save()
+    task = BackgroundTask(lambda t: library.write_save(saving, path, False, t.report))
+    t0 = time.perf_counter()
+    task.start()
+    worst = ticks = 0
+    last = time.perf_counter()
+    while not task.done:
+        time.sleep(TICK_S)
+        now = time.perf_counter()
+        worst = max(worst, now - last - TICK_S)
+        last = now
+        pid = rnd.randint(1, N)
+        pub = library.get(pid)
+        before.setdefault(pid, (pub.available, pub.borrowed_to, len(pub.history)))
+        if pub.available:
+            library.borrow(pid, 'Ana Horvat')
+        else:
+            library.return_publication(pid)
+        ticks += 1
+    elapsed = time.perf_counter() - t0
+    if task.error is not None:
+        raise task.error
+    library.end_save(saving, path)
+    print(f'  spremanje u pozadini: {elapsed:.2f}s, {ticks} radnji na pultu, '
+          f'najdulji zastoj {worst * 1000:.1f} ms')
+
+    saved = {p.id: p for p in read_catalogue(path)[0]}
+    for pid, (available, borrowed_to, depth) in before.items():
+        p = saved[pid]
+        assert (p.available, p.borrowed_to, len(p.history)) == (available, borrowed_to, depth), pid
+    records, _ = read_journal(journal_path(path), file_token(path))
+    assert len(records) == ticks, (len(records), ticks)
+    library.close()
+    if worst > MAX_STALL_S:
+        print(f'  PREKORAČENO: zastoj veći od {MAX_STALL_S * 1000:.0f} ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
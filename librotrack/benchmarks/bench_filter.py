@@ -0,0 +1,50 @@
+import random
+
+from synthetic import make_catalogue, best_of
+from search_index import SearchIndex
+
+N = 1_000_000
+FILTERS = [('Sve', 'Sve', ''), ('Knjiga', 'Sve', ''), ('Casopis', 'Posuđeno', ''), ('Sve', 'Dostupno', ''),
+           ('Knjiga', 'Dostupno', 'krleža'), ('Casopis', 'Posuđeno', 'more'), ('Knjiga', 'Posuđeno', 'ač')]
+
+
+# The previous per-publication loop over the search candidates.
+def scan(pubs, index, typ, stat, q):
+    ids = index.search(q) if q else list(pubs)
+    res = []
+    for pid in ids:
+        p = pubs[pid]
+        if typ != 'Sve' and p.type != typ:
+            continue
+        if stat == 'Dostupno' and not p.available:
+            continue
+        if stat == 'Posuđeno' and p.available:
+            continue
+        res.append(pid)
+    return res
+
+
+def main():
+    pubs = {p.id: p for p in make_catalogue(N, borrowed_ratio=0.3)}
+    index = SearchIndex()
+    for p in pubs.values():
+        index.add(p)
+    rnd = random.Random(7)
+    for pid in rnd.sample(list(pubs), 1000):
+        index.remove(pid)
+        del pubs[pid]
+    for pid in rnd.sample(list(pubs), 1000):
+        pub = pubs[pid]
+        pub.available = not pub.available
+        index.set_available(pid, pub.available)
+    print(f'{"tip":>8} {"status":>9} {"upit":>8} {"pogodaka":>9} {"petlja":>10} {"maske":>10}')
+    for typ, stat, q in FILTERS:
+        expected = scan(pubs, index, typ, stat, q)
+        assert index.filter(typ, stat, q) == expected, (typ, stat, q)
+        t_scan = best_of(lambda: scan(pubs, index, typ, stat, q), 1)
+        t_mask = best_of(lambda: index.filter(typ, stat, q))
+        print(f'{typ:>8} {stat:>9} {q:>8} {len(expected):>9} {t_scan * 1e3:>8.1f}ms {t_mask * 1e3:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
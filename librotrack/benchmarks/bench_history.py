@@ -0,0 +1,38 @@
+import datetime
+import time
+
+from synthetic import USERS, best_of
+
+from history_index import HistoryFilter, HistoryIndex, HistoryPager
+from models import History
+
+DEPTHS = (1_000, 10_000, 100_000)
+
+
+def make_history(n):
+    history = History()
+    start = datetime.date(2000, 1, 1).toordinal()
+    for i in range(n):
+        day = datetime.date.fromordinal(start + i // 4).isoformat()
+        history.add(USERS[i % len(USERS)], day, 'posudba' if i % 2 == 0 else 'vraćanje')
+    return history
+
+
+# Opening the history dialog: formatting every entry as the old Listbox did
+# against the first page from a pager; then a filtered first page.
+def main():
+    f = HistoryFilter(user=USERS[2], action='posudba', start='2010-01-01', end='2010-12-31')
+    print(f'{"entries":>9} {"all rows":>10} {"1st page":>10} {"index":>10} {"filter":>10}')
+    for n in DEPTHS:
+        history = make_history(n)
+        t_all = best_of(lambda: [f"{e.get('date')} — {e.get('action')} — {e.get('user')}" for e in history], 1)
+        t_page = best_of(lambda: HistoryPager(history).fetch())
+        t = time.perf_counter()
+        index = HistoryIndex(history)
+        t_index = time.perf_counter() - t
+        t_filter = best_of(lambda: HistoryPager(history, index.positions(f)).fetch())
+        print(f'{n:>9} {t_all * 1e3:>8.1f}ms {t_page * 1e3:>8.2f}ms {t_index * 1e3:>8.1f}ms {t_filter * 1e3:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import threading
+import time
+
+from synthetic import make_catalogue
+from journal import Journal, file_token, journal_path
+from snapshot import write_snapshot
+
+N = 100_000
+ACTIONS = 200
+WRITERS = 8
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'katalog.ltrk')
+    pubs = make_catalogue(N, history_depth=5)
+    t = time.perf_counter()
+    write_snapshot(path, pubs, N + 1)
+    full = time.perf_counter() - t
+    print(f'puno spremanje snimke ({N} publikacija): {full * 1e3:.0f}ms po radnji')
+
+    journal = Journal(journal_path(path), file_token(path))
+    t = time.perf_counter()
+    for i in range(ACTIONS):
+        journal.append({'op': 'borrow', 'id': i + 1, 'user': 'Ana Horvat', 'date': '2026-10-18'})
+    single = (time.perf_counter() - t) / ACTIONS
+    print(f'dnevnik, jedna radnja za drugom: {single * 1e3:.2f}ms po radnji (s fsync)')
+
+    def writer(k):
+        for i in range(ACTIONS // WRITERS):
+            journal.append({'op': 'return', 'id': k * ACTIONS + i + 1, 'date': '2026-10-19'})
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(WRITERS)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    grouped = (time.perf_counter() - t) / ACTIONS
+    print(f'dnevnik, {WRITERS} istodobnih pisača: {grouped * 1e3:.2f}ms po radnji (grupni fsync)')
+    journal.close()
+
+
+if __name__ == '__main__':
+    main()
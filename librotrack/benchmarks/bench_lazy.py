@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import make_catalogue
+from snapshot import read_snapshot, write_snapshot
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+HISTORY = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+
+def measure(lazy, path):
+    tracemalloc.start()
+    t = time.perf_counter()
+    pubs, _ = read_snapshot(path, lazy_history=lazy)
+    elapsed = time.perf_counter() - t
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return pubs, elapsed, current
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'katalog.ltrk')
+    pubs = make_catalogue(N, history_depth=HISTORY)
+    write_snapshot(path, pubs, N + 1)
+    entries = sum(len(p.history) for p in pubs)
+    del pubs
+    print(f'{N} publikacija, {entries} zapisa povijesti')
+    for lazy in (False, True):
+        pubs, elapsed, memory = measure(lazy, path)
+        label = 'lijeno' if lazy else 'odmah'
+        t = time.perf_counter()
+        len(pubs[N // 2].history[0])
+        first = time.perf_counter() - t
+        print(f'{label:>7}: otvaranje {elapsed:5.2f}s, memorija {memory / 1e6:6.0f} MB, '
+              f'prva povijest {first * 1e6:.0f}us')
+        del pubs
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from synthetic import make_catalogue
+from models import Publication
+from xml_io import read_catalogue
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+HISTORY = 5
+
+
+def write_dom(path, pubs, next_id):
+    root = ET.Element('library', attrib={'next_id': str(next_id)})
+    for p in pubs:
+        root.append(p.to_xml_element())
+    ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def load_dom(path):
+    root = ET.parse(path).getroot()
+    return [Publication.from_xml_element(el) for el in root.findall('publication')], int(root.attrib['next_id'])
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    t = time.perf_counter()
+    result = fn(path)
+    elapsed = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    pubs = make_catalogue(N, history_depth=HISTORY)
+    path = os.path.join(tempfile.mkdtemp(), 'katalog.xml')
+    write_dom(path, pubs, N + 1)
+    del pubs
+    print(f'{N} publikacija, datoteka {os.path.getsize(path) / 1e6:.0f} MB')
+    for name, fn in (('ET.parse', load_dom), ('iterparse', read_catalogue)):
+        (loaded, next_id), elapsed, peak = measure(fn, path)
+        assert len(loaded) == N and next_id == N + 1
+        print(f'{name:>10}: {elapsed:6.2f}s, vršna memorija {peak / 1e6:7.0f} MB')
+        del loaded
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
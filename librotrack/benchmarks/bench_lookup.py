@@ -0,0 +1,44 @@
+import random
+
+from synthetic import make_catalogue, best_of
+
+LOOKUPS = 200
+
+
+def main():
+    print(f'{"n":>9} {"scan get":>12} {"index get":>12} {"scan delete":>12} {"index delete":>12}')
+    for n in (10_000, 100_000, 1_000_000):
+        pubs = make_catalogue(n)
+        as_list = list(pubs)
+        as_index = {p.id: p for p in pubs}
+        ids = random.Random(1).sample(range(1, n + 1), LOOKUPS)
+
+        def scan_get():
+            for pid in ids:
+                for p in as_list:
+                    if p.id == pid:
+                        break
+
+        def index_get():
+            for pid in ids:
+                as_index.get(pid)
+
+        def scan_delete():
+            pid = ids[0]
+            [p for p in as_list if p.id != pid]
+
+        def index_delete():
+            for pid in ids:
+                pub = as_index.pop(pid)
+                as_index[pid] = pub
+
+        t_scan = best_of(scan_get, 1) / LOOKUPS
+        t_index = best_of(index_get) / LOOKUPS
+        t_scan_del = best_of(scan_delete, 1)
+        t_index_del = best_of(index_delete) / LOOKUPS
+        print(f'{n:>9} {t_scan * 1e6:>10.1f}us {t_index * 1e6:>10.3f}us '
+              f'{t_scan_del * 1e6:>10.1f}us {t_index_del * 1e6:>10.3f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from synthetic import AUTHORS, USERS as NAMES, WORDS
+from models import Publication
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+HISTORY = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+@dataclass
+class OldPublication:
+    id: int
+    type: str
+    title: str
+    author_or_publisher: str
+    year: str
+    available: bool = True
+    borrowed_to: str = ''
+    borrow_date: str = ''
+    history: List[Dict] = field(default_factory=list)
+
+
+def build(cls):
+    pubs = []
+    for i in range(1, N + 1):
+        # Fresh strings per entry, as the XML parser produces them.
+        pub = cls(i, 'Knjiga', f'{WORDS[i % len(WORDS)]} {i}', AUTHORS[i % len(AUTHORS)], str(1900 + i % 120))
+        for d in range(HISTORY):
+            pub.history.append({'user': ''.join(NAMES[(i + d) % len(NAMES)]),
+                                'date': f'20{10 + d % 15:02d}-{1 + d % 12:02d}-{1 + d % 28:02d}',
+                                'action': ''.join('posudba' if d % 2 == 0 else 'vraćanje')})
+        pubs.append(pub)
+    return pubs
+
+
+def measure(cls):
+    tracemalloc.start()
+    pubs = build(cls)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return pubs, size
+
+
+def main():
+    print(f'{N} publikacija x {HISTORY} zapisa povijesti')
+    old, old_size = measure(OldPublication)
+    del old
+    new, new_size = measure(Publication)
+    print(f'  dict + lista rječnika: {old_size / 1e6:8.0f} MB ({old_size / N:.0f} B po publikaciji)')
+    print(f'  slots + pakirani redci: {new_size / 1e6:8.0f} MB ({new_size / N:.0f} B po publikaciji)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import datetime
+import random
+
+from synthetic import make_catalogue, best_of
+
+from loans import DueIndex, is_overdue, today
+
+ACTIONS = 200
+
+
+# Finding the overdue loans: a scan that parses every borrow date against the
+# due-date index, plus the cost of keeping the index up to date per borrow.
+def main():
+    day = today()
+    print(f'{"n":>9} {"overdue":>8} {"scan":>10} {"index":>10} {"borrow":>10}')
+    for n in (10_000, 100_000, 1_000_000):
+        rnd = random.Random(1)
+        pubs = make_catalogue(n)
+        for p in pubs:
+            if not p.available:
+                p.borrow_date = datetime.date.fromordinal(day - rnd.randint(0, 40)).isoformat()
+        index = DueIndex(pubs)
+        expected = sorted(p.id for p in pubs if is_overdue(p, day))
+        assert sorted(index.overdue(day)) == expected
+
+        borrowed = [p for p in pubs if not p.available]
+        sample = rnd.sample(borrowed, min(ACTIONS, len(borrowed)))
+
+        def churn():
+            for p in sample:
+                index.remove(p.id)
+                index.add(p)
+
+        t_scan = best_of(lambda: [p.id for p in pubs if is_overdue(p, day)], 1)
+        t_index = best_of(lambda: index.overdue(day))
+        t_churn = best_of(churn) / len(sample)
+        print(f'{n:>9} {len(expected):>8} {t_scan * 1e3:>8.1f}ms {t_index * 1e3:>8.2f}ms '
+              f'{t_churn * 1e6:>8.1f}us')
+
+
+if __name__ == '__main__':
+    main()
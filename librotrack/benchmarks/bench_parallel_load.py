@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_catalogue
+from xml_io import read_catalogue, read_catalogue_parallel, write_catalogue
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+HISTORY = 5
+
+
+def main():
+    pubs = make_catalogue(N, history_depth=HISTORY)
+    pubs[3].history.append({'user': 'Ana', 'date': 'jučer', 'action': 'otpis'})
+    path = os.path.join(tempfile.mkdtemp(), 'katalog.xml')
+    write_catalogue(path, pubs, N + 7)
+    del pubs
+    print(f'{N} publikacija, {os.path.getsize(path) / 1e6:.0f} MB, {os.cpu_count()} jezgri')
+    t = time.perf_counter()
+    expected = read_catalogue(path)
+    t_serial = time.perf_counter() - t
+    print(f'  serijski: {t_serial:.2f}s')
+    for workers in sorted({2, 4, os.cpu_count() or 1}):
+        t = time.perf_counter()
+        result = read_catalogue_parallel(path, workers=workers, min_bytes=0)
+        elapsed = time.perf_counter() - t
+        assert result == expected, workers
+        print(f'  {workers:>2} procesa: {elapsed:.2f}s ({t_serial / elapsed:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import time
+
+from synthetic import USERS, make_catalogue, best_of
+
+from patrons import PatronIndex, normalise_user
+
+
+# "What does this patron hold and what have they borrowed?" answered by a
+# scan over every publication and history against the patron index.
+def main():
+    user = USERS[3]
+    print(f'{"n":>9} {"build":>9} {"scan":>10} {"index":>10}')
+    for n in (10_000, 100_000, 500_000):
+        pubs = make_catalogue(n, history_depth=5)
+        t = time.perf_counter()
+        index = PatronIndex(pubs)
+        t_build = time.perf_counter() - t
+        key = normalise_user(user)
+
+        def scan():
+            held = [p.id for p in pubs if not p.available and normalise_user(p.borrowed_to) == key]
+            past = [(p.id, i) for p in pubs for i, u in p.history.borrow_entries() if normalise_user(u) == key]
+            return held, past
+
+        def lookup():
+            return index.holding(user), index.borrows(user)
+
+        held, past = scan()
+        assert lookup() == (held, past)
+        t_scan = best_of(scan, 1)
+        t_index = best_of(lookup)
+        print(f'{n:>9} {t_build:>8.2f}s {t_scan * 1e3:>8.0f}ms {t_index * 1e3:>8.2f}ms  ({len(past)} posudbi)')
+
+
+if __name__ == '__main__':
+    main()
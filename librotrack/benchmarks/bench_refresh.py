@@ -0,0 +1,63 @@
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from synthetic import make_catalogue
+from virtual_tree import VirtualTreeview
+
+COLUMNS = ('id', 'title', 'author', 'year', 'status')
+SIZES = (1_000, 10_000, 100_000)
+
+
+def row_values(p):
+    return (p.id, p.title, p.author_or_publisher, p.year, p.status_text())
+
+
+def full_refresh(tree, pubs):
+    for item in tree.get_children():
+        tree.delete(item)
+    for p in pubs:
+        tree.insert('', tk.END, values=row_values(p))
+
+
+def timed(root, fn):
+    t = time.perf_counter()
+    fn()
+    root.update_idletasks()
+    return time.perf_counter() - t
+
+
+def main():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f'Tk nije dostupan ({e}); pokrenite na računalu sa zaslonom.')
+    root.withdraw()
+
+    plain = ttk.Treeview(root, columns=COLUMNS, show='headings', height=20)
+    plain.pack()
+    print(f'{"rows":>8} {"full refresh":>14} {"virtual refresh":>16} {"virtual scroll":>15} {"row update":>12}')
+    for n in SIZES:
+        pubs = make_catalogue(n)
+        by_id = {p.id: p for p in pubs}
+        virtual = VirtualTreeview(root, COLUMNS, lambda pid: row_values(by_id[pid]), height=20)
+        virtual.pack()
+        ids = [p.id for p in pubs]
+
+        t_full = timed(root, lambda: full_refresh(plain, pubs))
+        t_virtual = timed(root, lambda: virtual.set_items(ids))
+        t_scroll = timed(root, lambda: virtual.on_scrollbar('moveto', '0.5'))
+        borrowed = ids[virtual.offset]
+        by_id[borrowed].available = False
+        t_update = timed(root, lambda: virtual.update_item(borrowed, True, lambda pid: pid))
+        print(f'{n:>8} {t_full * 1e3:>12.1f}ms {t_virtual * 1e3:>14.2f}ms {t_scroll * 1e3:>13.2f}ms '
+              f'{t_update * 1e3:>10.2f}ms')
+
+        full_refresh(plain, [])
+        virtual.destroy()
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main()
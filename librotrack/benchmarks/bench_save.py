@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import make_catalogue
+from bench_load import write_dom
+from xml_io import write_catalogue
+
+HISTORY = 5
+
+
+def measure(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 50_000]
+    directory = tempfile.mkdtemp()
+    dom_path = os.path.join(directory, 'dom.xml')
+    stream_path = os.path.join(directory, 'stream.xml')
+    for n in sizes:
+        pubs = make_catalogue(n, history_depth=HISTORY)
+        t_dom, m_dom = measure(lambda: write_dom(dom_path, pubs, n + 1))
+        t_stream, m_stream = measure(lambda: write_catalogue(stream_path, pubs, n + 1))
+        with open(dom_path, 'rb') as a, open(stream_path, 'rb') as b:
+            assert a.read() == b.read()
+        print(f'{n:>8}: ElementTree {t_dom:5.2f}s / {m_dom / 1e6:6.0f} MB, '
+              f'streaming {t_stream:5.2f}s / {m_stream / 1e6:6.2f} MB')
+    os.remove(dom_path)
+    os.remove(stream_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import time
+
+from synthetic import make_catalogue, best_of
+from search_index import SearchIndex
+
+N = 500_000
+QUERIES = ['zvijezda ribar', 'krleža', 'ujević', 'šuma 4711', 'priča', '12345', 'more', 'ač', 'x']
+
+
+def scan(pubs, q):
+    return [p.id for p in pubs if q in p.title.lower() or q in p.author_or_publisher.lower()]
+
+
+def main():
+    pubs = make_catalogue(N)
+    index = SearchIndex()
+    t = time.perf_counter()
+    for p in pubs:
+        index.add(p)
+    print(f'build: {time.perf_counter() - t:.2f}s for {N} publications')
+    print(f'{"query":>16} {"hits":>8} {"scan":>10} {"index":>10}')
+    for q in QUERIES:
+        expected = scan(pubs, q)
+        assert index.search(q) == expected, q
+        t_scan = best_of(lambda: scan(pubs, q), 1)
+        t_index = best_of(lambda: index.search(q))
+        print(f'{q:>16} {len(expected):>8} {t_scan * 1e3:>8.1f}ms {t_index * 1e3:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_catalogue
+from snapshot import read_snapshot, write_snapshot
+from xml_io import read_catalogue, write_catalogue
+
+HISTORY = 5
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+    directory = tempfile.mkdtemp()
+    xml_path = os.path.join(directory, 'katalog.xml')
+    snap_path = os.path.join(directory, 'katalog.ltrk')
+    print(f'{"n":>9} {"XML save":>9} {"snap save":>10} {"XML load":>9} {"snap load":>10} {"XML MB":>7} {"snap MB":>8}')
+    for n in sizes:
+        pubs = make_catalogue(n, history_depth=HISTORY)
+        _, t_xml_save = timed(lambda: write_catalogue(xml_path, pubs, n + 1))
+        _, t_snap_save = timed(lambda: write_snapshot(snap_path, pubs, n + 1))
+        del pubs
+        (from_xml, _), t_xml_load = timed(lambda: read_catalogue(xml_path))
+        del from_xml
+        (from_snap, _), t_snap_load = timed(lambda: read_snapshot(snap_path))
+        del from_snap
+        print(f'{n:>9} {t_xml_save:>8.1f}s {t_snap_save:>9.2f}s {t_xml_load:>8.1f}s {t_snap_load:>9.2f}s '
+              f'{os.path.getsize(xml_path) / 1e6:>7.0f} {os.path.getsize(snap_path) / 1e6:>8.0f}')
+    os.remove(xml_path)
+    os.remove(snap_path)
+
+
+if __name__ == '__main__':
+    main()
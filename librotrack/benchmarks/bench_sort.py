@@ -0,0 +1,41 @@
+import random
+import time
+
+from synthetic import make_catalogue, best_of
+from sort_index import COLUMN_KEYS, SortIndex
+
+N = 500_000
+
+
+def main():
+    pubs = make_catalogue(N, borrowed_ratio=0.3)
+    by_id = {p.id: p for p in pubs}
+    half = [p.id for p in pubs if p.type == 'Knjiga' and p.available]
+    few = half[::40]
+    print(f'{"stupac":>8} {"izgradnja":>10} {"sve":>9} {"dio":>9} {"malo":>9} {"sort()":>9} {"umetanje":>10}')
+    for column, key_of in COLUMN_KEYS.items():
+        t = time.perf_counter()
+        index = SortIndex(column, pubs)
+        t_build = time.perf_counter() - t
+        expected = sorted(half, key=lambda pid: (key_of(by_id[pid]), pid))
+        assert index.ordered(half) == expected, column
+        keep = set(few)
+        assert index.ordered(few) == [pid for pid in expected if pid in keep], column
+        t_all = best_of(lambda: index.ordered([p.id for p in pubs]), 3)
+        t_half = best_of(lambda: index.ordered(half), 3)
+        t_few = best_of(lambda: index.ordered(few), 3)
+        t_sort = best_of(lambda: sorted(half, key=lambda pid: key_of(by_id[pid])), 1)
+        sample = random.Random(1).sample(pubs, 200)
+
+        def churn():
+            for p in sample:
+                index.remove(p.id)
+                index.add(p)
+
+        t_churn = best_of(churn, 3) / len(sample)
+        print(f'{column:>8} {t_build:>9.2f}s {t_all * 1e3:>7.0f}ms {t_half * 1e3:>7.0f}ms {t_few * 1e3:>7.1f}ms '
+              f'{t_sort * 1e3:>7.0f}ms {t_churn * 1e6:>8.0f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_catalogue
+from sqlite_store import SqliteLibrary
+
+HISTORY = 3
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 500_000]
+    directory = tempfile.mkdtemp()
+    print(f'{"n":>8} {"open+count":>11} {"borrow":>9} {"return":>9} {"filter":>9} {"search":>9}')
+    for n in sizes:
+        path = os.path.join(directory, f'katalog{n}.db')
+        db = SqliteLibrary(path)
+        db.import_publications(make_catalogue(n, history_depth=HISTORY, borrowed_ratio=0), n + 1)
+        db.close()
+
+        db, t_open = timed(lambda: SqliteLibrary(path))
+        _, t_count = timed(db.counts)
+        _, t_borrow = timed(lambda: db.borrow(n // 2, 'Ana Horvat', '2026-10-18'))
+        _, t_return = timed(lambda: db.return_publication(n // 2, '2026-10-19'))
+        _, t_filter = timed(lambda: db.filter_ids('Casopis', 'Posuđeno', ''))
+        _, t_search = timed(lambda: db.filter_ids('Sve', 'Sve', f'šuma {n // 3}'))
+        print(f'{n:>8} {(t_open + t_count) * 1e3:>9.1f}ms {t_borrow * 1e3:>7.2f}ms {t_return * 1e3:>7.2f}ms '
+              f'{t_filter * 1e3:>7.2f}ms {t_search * 1e3:>7.2f}ms')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
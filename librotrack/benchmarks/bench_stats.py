@@ -0,0 +1,37 @@
+import random
+
+from synthetic import make_catalogue, best_of
+
+from stats import LibraryStats
+
+ACTIONS = 200
+
+
+# Cost of refreshing the status bar after one desk action: the old full scan
+# against reading the maintained counters (including their update).
+def main():
+    print(f'{"n":>9} {"scan":>12} {"counters":>12}')
+    for n in (10_000, 100_000, 1_000_000):
+        pubs = {p.id: p for p in make_catalogue(n)}
+        stats = LibraryStats(pubs.values())
+        ids = random.Random(1).sample(range(1, n + 1), ACTIONS)
+
+        def scan():
+            for _ in ids:
+                len(pubs), sum(1 for p in pubs.values() if p.available)
+
+        def counters():
+            for pid in ids:
+                pub = pubs[pid]
+                stats.remove(pub)
+                stats.add(pub)
+                stats.total, stats.available
+
+        t_scan = best_of(scan, 1) / ACTIONS
+        t_counters = best_of(counters) / ACTIONS
+        print(f'{n:>9} {t_scan * 1e3:>10.2f}ms {t_counters * 1e6:>10.2f}us')
+    stats.verify(pubs.values())
+
+
+if __name__ == '__main__':
+    main()
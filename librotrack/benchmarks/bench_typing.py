@@ -0,0 +1,79 @@
+import sys
+import time
+import tkinter as tk
+
+from synthetic import make_catalogue
+import librotrack
+
+N = 500_000
+QUERY = 'zvijezda rib'
+KEY_INTERVAL_MS = 60
+
+
+def make_app(pubs):
+    app = librotrack.LibraryApp(restore=False)
+    app.withdraw()
+    library = app.library
+    for p in pubs:
+        library.publications[p.id] = p
+        library.search_index.add(p)
+    library.stats.rebuild(pubs)
+    library.next_id = len(pubs) + 1
+    return app
+
+
+def sync_typing(app):
+    # The old behaviour: a full filter + table refresh on every keystroke.
+    worst = total = 0.0
+    for i in range(1, len(QUERY) + 1):
+        app.search_var.set(QUERY[:i])
+        t = time.perf_counter()
+        app.table.set_items(app.library.filter(app.filter_type.get(), app.filter_status.get(), QUERY[:i].lower()))
+        app.update_idletasks()
+        dt = time.perf_counter() - t
+        worst = max(worst, dt)
+        total += dt
+    return worst, total
+
+
+def debounced_typing(app):
+    painted = {}
+    set_items = app.table.set_items
+
+    def record(items):
+        set_items(items)
+        app.update_idletasks()
+        painted[app.view_filter[2]] = time.perf_counter()
+
+    app.table.set_items = record
+    typed = {}
+
+    def type_key(i):
+        app.search_var.set(QUERY[:i])
+        typed[QUERY[:i]] = time.perf_counter()
+        app.schedule_refresh()
+        if i < len(QUERY):
+            app.after(KEY_INTERVAL_MS, type_key, i + 1)
+
+    app.after(0, type_key, 1)
+    deadline = time.perf_counter() + 30
+    while QUERY not in painted and time.perf_counter() < deadline:
+        app.update()
+    app.table.set_items = set_items
+    return painted[QUERY] - typed[QUERY], sorted(painted)
+
+
+def main():
+    try:
+        app = make_app(make_catalogue(N))
+    except tk.TclError as e:
+        sys.exit(f'Tk nije dostupan ({e}); pokrenite na računalu sa zaslonom.')
+    worst, total = sync_typing(app)
+    print(f'sinkrono:  najdulja blokada {worst * 1e3:.0f}ms, ukupno {total * 1e3:.0f}ms za {len(QUERY)} tipki')
+    latency, painted = debounced_typing(app)
+    print(f'odgođeno:  zadnja tipka -> prikaz {latency * 1e3:.0f}ms, iscrtani upiti: {painted}')
+    app.destroy()
+
+
+if __name__ == '__main__':
+    main()
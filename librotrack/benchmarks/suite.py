@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import make_library
+
+from library import Library
+from models import Publication
+from snapshot import SNAPSHOT_EXT
+
+SAMPLE = 10_000
+VISIBLE_ROWS = 30
+
+
+# Every case takes (library, directory) and returns the operation to time.
+# Cases that change the catalogue leave it as they found it.
+def get_filtered_publications(library, directory):
+    return lambda: [library.get(pid) for pid in library.filter('Knjiga', 'Posuđeno', 'zvijezda')]
+
+
+def filter_text(library, directory):
+    return lambda: library.filter('Sve', 'Sve', 'more grad')
+
+
+def lookup_by_id(library, directory):
+    ids = random.Random(1).choices(range(1, library.next_id), k=SAMPLE)
+    return lambda: [library.get(pid) for pid in ids]
+
+
+def to_xml_element(library, directory):
+    pubs = list(library.publications.values())[:SAMPLE]
+    return lambda: [p.to_xml_element() for p in pubs]
+
+
+def from_xml_element(library, directory):
+    elements = [p.to_xml_element() for p in list(library.publications.values())[:SAMPLE]]
+    return lambda: [Publication.from_xml_element(el) for el in elements]
+
+
+def save_xml(library, directory):
+    return lambda: library.save(os.path.join(directory, 'katalog.xml'))
+
+
+# Loads time Library.read, the reading and indexing half of a load; the
+# install half only swaps references and opens the journal, which the
+# saving library already has open on the same file.
+def load_xml(library, directory):
+    path = os.path.join(directory, 'katalog.xml')
+    library.save(path)
+    return lambda: Library.read(path)
+
+
+def save_snapshot(library, directory):
+    return lambda: library.save(os.path.join(directory, 'katalog' + SNAPSHOT_EXT), snapshot=True)
+
+
+def load_snapshot(library, directory):
+    path = os.path.join(directory, 'katalog' + SNAPSHOT_EXT)
+    library.save(path, snapshot=True)
+    return lambda: Library.read(path)
+
+
+# With a display the real LibraryApp is timed, withdrawn; without one the
+# same work minus Tk: filter and the row values of one screenful.
+def make_app(library):
+    try:
+        import librotrack
+        app = librotrack.LibraryApp(restore=False)
+    except Exception:
+        return None
+    app.withdraw()
+    app.library = library
+    return app
+
+
+def refresh_tree(library, directory, app=None):
+    if app is not None:
+        def refresh():
+            app.refresh_tree()
+            app.update_idletasks()
+        return refresh
+
+    def refresh():
+        ids = library.filter('Sve', 'Sve', '')
+        for pid in ids[:VISIBLE_ROWS]:
+            p = library.get(pid)
+            (p.id, p.title, p.author_or_publisher, p.year, p.status_text())
+    return refresh
+
+
+def update_status_bar(library, directory, app=None):
+    if app is not None:
+        return app.update_status_bar
+
+    def status():
+        total, available = library.counts()
+        f'Ukupno: {total} | Dostupno: {available} | Posuđeno: {total - available} | ' \
+            f'Zakašnjelo: {library.count_overdue()}'
+    return status
+
+
+CASES = {
+    'get_filtered_publications': get_filtered_publications,
+    'filter_text': filter_text,
+    'refresh_tree': refresh_tree,
+    'update_status_bar': update_status_bar,
+    'lookup_by_id': lookup_by_id,
+    'to_xml_element': to_xml_element,
+    'from_xml_element': from_xml_element,
+    'save_xml': save_xml,
+    'load_xml': load_xml,
+    'save_snapshot': save_snapshot,
+    'load_snapshot': load_snapshot,
+}
+MIN_REPEAT = 5
+UI_CASES = {'refresh_tree', 'update_status_bar'}
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'best': min(times), 'median': statistics.median(times), 'runs': repeat, 'peak_bytes': peak}
+
+
+# Peak resident size of the whole run, in bytes; None where unavailable.
+def max_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return out.stdout.strip()
+
+
+def run(args) -> dict:
+    results = {}
+    headless = None
+    for n in args.sizes:
+        library = make_library(n, args.history, args.borrowed)
+        app = make_app(library) if not args.headless else None
+        headless = app is None
+        directory = tempfile.mkdtemp(prefix='librotrack-bench-')
+        try:
+            for name, case in CASES.items():
+                if args.cases and name not in args.cases:
+                    continue
+                fn = case(library, directory, app) if name in UI_CASES else case(library, directory)
+                result = results[f'{name}/{n}'] = measure(fn, args.repeat)
+                print(f'  {name:<26} {n:>9}  {result["best"] * 1e3:10.2f} ms  '
+                      f'{result["peak_bytes"] / 1e6:8.1f} MB', flush=True)
+        finally:
+            library.close()
+            if app is not None:
+                app.destroy()
+            shutil.rmtree(directory, ignore_errors=True)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'headless': headless,
+            'sizes': args.sizes,
+            'history_depth': args.history,
+            'borrowed_ratio': args.borrowed,
+            'max_rss_bytes': max_rss(),
+        },
+        'results': results,
+    }
+
+
+# Cases whose median is slower than the baseline's by more than `threshold`
+# (and by more than `min_delta` seconds, so timer noise on fast cases does
+# not trip it).
+def regressions(current: dict, baseline: dict, threshold: float, min_delta: float) -> list:
+    found = []
+    for key, result in current['results'].items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else 1.0
+        if ratio > 1 + threshold and result['median'] - old['median'] > min_delta:
+            found.append((key, old['median'], result['median'], ratio))
+    return found
+
+
+# A slowdown counts only if it shows again when its cases are measured a
+# second time; one noisy run on a busy machine is not a regression.
+def confirmed_regressions(args, current: dict, baseline: dict) -> list:
+    found = regressions(current, baseline, args.threshold, args.min_delta)
+    if not found:
+        return []
+    keys = {key for key, *_ in found}
+    again = argparse.Namespace(**vars(args))
+    again.cases = sorted({key.split('/')[0] for key in keys})
+    again.sizes = sorted({int(key.split('/')[1]) for key in keys})
+    print('Ponovno mjerenje sporijih slučajeva...')
+    rerun = run(again)
+    rerun['results'] = {key: result for key, result in rerun['results'].items() if key in keys}
+    return regressions(rerun, baseline, args.threshold, args.min_delta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LibroTrack benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--history', type=int, default=5, help='history depth per publication')
+    parser.add_argument('--borrowed', type=float, default=0.2, help='share of publications on loan')
+    parser.add_argument('--repeat', type=int, default=MIN_REPEAT, help=f'runs per case, at least {MIN_REPEAT}')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES))
+    parser.add_argument('--headless', action='store_true', help='do not use Tk even if a display is available')
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--min-delta', type=float, default=0.002, help='ignore slowdowns under this many seconds')
+    args = parser.parse_args()
+    if args.repeat < MIN_REPEAT:
+        parser.error(f'--repeat mora biti barem {MIN_REPEAT}')
+
+    current = run(args)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    if not args.baseline:
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('headless') != current['meta']['headless']:
+        print('Upozorenje: osnovica i ovo mjerenje ne koriste isti način (Tk / bez Tk).')
+    found = confirmed_regressions(args, current, baseline)
+    for key, old, new, ratio in found:
+        print(f'REGRESIJA {key}: {old * 1e3:.2f} ms -> {new * 1e3:.2f} ms ({ratio:.2f}x)')
+    if found:
+        sys.exit(1)
+    print(f'Nema regresija većih od {args.threshold:.0%} u odnosu na {args.baseline}.')
+
+
+if __name__ == '__main__':
+    main()
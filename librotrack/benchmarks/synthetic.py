@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Publication
+
+WORDS = ['knjiga', 'priča', 'more', 'grad', 'zvijezda', 'škola', 'put', 'noć', 'ljeto', 'čovjek',
+         'đak', 'rijeka', 'šuma', 'pjesma', 'vrijeme', 'svijet', 'kuća', 'ribar', 'zemlja', 'sunce']
+AUTHORS = ['Ivana Brlić-Mažuranić', 'Miroslav Krleža', 'August Šenoa', 'Marko Marulić', 'Tin Ujević',
+           'Dobriša Cesarić', 'Vladimir Nazor', 'Ksaver Šandor Gjalski', 'Profil', 'Školska knjiga']
+USERS = ['Ana Horvat', 'Ivan Kovačević', 'Petra Babić', 'Luka Marić', 'Marija Jurić', 'Josip Novak',
+         'Lucija Knežević', 'Marko Vuković', 'Ema Perić', 'Filip Matić']
+
+
+def make_catalogue(n, history_depth=0, borrowed_ratio=0.2, seed=42):
+    rnd = random.Random(seed)
+    pubs = []
+    for i in range(1, n + 1):
+        title = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 5))).capitalize() + f' {i}'
+        typ = 'Knjiga' if rnd.random() < 0.8 else 'Casopis'
+        pub = Publication(i, typ, title, rnd.choice(AUTHORS), str(rnd.randint(1900, 2025)))
+        for d in range(history_depth):
+            user = rnd.choice(USERS)
+            day = f'20{10 + d % 15:02d}-{1 + d % 12:02d}-{1 + d % 28:02d}'
+            pub.history.append({'user': user, 'date': day, 'action': 'posudba'})
+            pub.history.append({'user': user, 'date': day, 'action': 'vraćanje'})
+        if rnd.random() < borrowed_ratio:
+            user = rnd.choice(USERS)
+            pub.available = False
+            pub.borrowed_to = user
+            pub.borrow_date = '2026-10-01'
+            pub.history.append({'user': user, 'date': '2026-10-01', 'action': 'posudba'})
+        pubs.append(pub)
+    return pubs
+
+
+# A headless Library over make_catalogue(...), indexed as a load would leave it.
+def make_library(n, history_depth=0, borrowed_ratio=0.2, seed=42):
+    from library import Library, LoadedCatalogue
+    pubs = make_catalogue(n, history_depth, borrowed_ratio, seed)
+    loaded = LoadedCatalogue('', {p.id: p for p in pubs}, n + 1, 0, 0)
+    library = Library()
+    library.publications = loaded.publications
+    library.search_index = loaded.search_index
+    library.stats = loaded.stats
+    library.due_index = loaded.due_index
+    library.patrons = None
+    library.next_id = loaded.next_id
+    return library
+
+
+def best_of(fn, repeat=5):
+    import time
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
@@ -0,0 +1,119 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import ACTIONS, USERS, History, day_number
+from patrons import normalise_user
+
+HISTORY_PAGE = 200
+
+
+class HistoryFilterError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class HistoryFilter:
+    # What the history viewer narrows a history down to. Empty fields do not
+    # filter; dates are ISO and both ends are inclusive.
+    user: str = ''
+    action: str = ''
+    start: str = ''
+    end: str = ''
+
+    def __post_init__(self):
+        for date in (self.start, self.end):
+            if date and day_number(date) <= 0:
+                raise HistoryFilterError(f'Neispravan datum: {date} (očekuje se GGGG-MM-DD)')
+
+    def __bool__(self):
+        return bool(self.user or self.action or self.start or self.end)
+
+    @property
+    def days(self) -> Tuple[int, int]:
+        return (day_number(self.start) if self.start else 1,
+                day_number(self.end) if self.end else 1 << 31)
+
+
+class HistoryIndex:
+    # Positions of one history's entries by normalised user, by action and
+    # by day, so a filter reads the smallest matching list and tests only
+    # those entries. Built on first filter, and brought up to date with the
+    # entries appended since then before each query.
+
+    def __init__(self, history: History):
+        self.history = history
+        self.size = 0
+        self.by_user: Dict[str, array] = {}
+        self.by_action: Dict[int, array] = {}
+        self._by_day: List[Tuple[int, int]] = []
+        self._user_keys: Dict[int, str] = {}
+        self.extend()
+
+    def extend(self):
+        h = self.history
+        keys = self._user_keys
+        for i in range(self.size, len(h)):
+            uid = h.users[i]
+            key = keys.get(uid)
+            if key is None:
+                key = keys[uid] = normalise_user(USERS[uid])
+            self.by_user.setdefault(key, array('I')).append(i)
+            self.by_action.setdefault(h.actions[i], array('I')).append(i)
+            if h.days[i] > 0:
+                self._by_day.append((h.days[i], i))
+        if len(h) > self.size:
+            self._by_day.sort()
+            self.size = len(h)
+
+    # Matching positions, newest first.
+    def positions(self, f: HistoryFilter) -> List[int]:
+        self.extend()
+        h = self.history
+        candidates = []
+        user = normalise_user(f.user)
+        if user:
+            candidates.append(self.by_user.get(user, ()))
+        action = ACTIONS.ids.get(f.action.strip()) if f.action else None
+        if f.action:
+            candidates.append(self.by_action.get(action, ()))
+        start, end = f.days
+        if f.start or f.end:
+            by_day = self._by_day
+            lo, hi = bisect_left(by_day, (start,)), bisect_right(by_day, (end, 1 << 32))
+            candidates.append(sorted(i for _, i in by_day[lo:hi]))
+        if not candidates:
+            return list(range(len(h) - 1, -1, -1))
+        smallest = min(candidates, key=len)
+        keys = self._user_keys
+        out = []
+        for i in reversed(smallest):
+            if user and keys[h.users[i]] != user:
+                continue
+            if f.action and h.actions[i] != action:
+                continue
+            if (f.start or f.end) and not start <= h.days[i] <= end:
+                continue
+            out.append(i)
+        return out
+
+
+class HistoryPager:
+    # Newest-first pages of an in-memory history. Without a filter it pages
+    # over a range of positions, so opening touches no entry but those shown;
+    # with one it pages over the positions the HistoryIndex returned.
+
+    def __init__(self, history: History, positions: Optional[Sequence[int]] = None):
+        self.history = history
+        self.positions = range(len(history) - 1, -1, -1) if positions is None else positions
+        self.offset = 0
+
+    @property
+    def done(self) -> bool:
+        return self.offset >= len(self.positions)
+
+    def fetch(self, limit: int = HISTORY_PAGE) -> List[Tuple[str, str, str]]:
+        page = self.positions[self.offset:self.offset + limit]
+        self.offset += len(page)
+        return [self.history.row(i) for i in page]
@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Tuple
+
+from atomic import atomic_write
+
+IMPORT_BATCH = 5000
+FIELDS = ('type', 'title', 'author_or_publisher', 'year')
+TYPES = {'knjiga': 'Knjiga', 'casopis': 'Casopis', 'časopis': 'Casopis'}
+# Column names accepted besides FIELDS, so a spreadsheet with Croatian
+# headings imports as is.
+ALIASES = {'tip': 'type', 'naslov': 'title', 'autor': 'author_or_publisher', 'izdavač': 'author_or_publisher',
+           'autor / izdavač': 'author_or_publisher', 'godina': 'year'}
+
+
+@dataclass
+class ImportReport:
+    added: int = 0
+    rejected: List[Tuple[int, str, Dict]] = field(default_factory=list)
+
+    def reject(self, row: int, reason: str, record: Dict):
+        self.rejected.append((row, reason, record))
+
+    def write(self, path: str):
+        with atomic_write(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('redak', 'razlog') + FIELDS)
+            for row, reason, record in self.rejected:
+                writer.writerow((row, reason) + tuple(record.get(k, '') for k in FIELDS))
+
+
+def normalise_type(value: str) -> str:
+    return TYPES.get(value.strip().lower(), '') if value.strip() else 'Knjiga'
+
+
+def _fields(record: Dict) -> Dict:
+    out = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        key = ALIASES.get(key, key)
+        if key in FIELDS:
+            out[key] = '' if value is None else str(value)
+    return out
+
+
+def read_csv(path: str) -> Iterator[Tuple[int, Dict]]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(f, dialect=dialect)
+        for record in reader:
+            yield reader.line_num, _fields(record)
+
+
+def read_jsonl(path: str) -> Iterator[Tuple[int, Dict]]:
+    with open(path, encoding='utf-8') as f:
+        for row, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row, {'_error': f'Neispravan JSON: {e}'}
+                continue
+            if not isinstance(record, dict):
+                yield row, {'_error': 'Zapis nije JSON objekt'}
+                continue
+            yield row, _fields(record)
+
+
+# Accepts the catalogue's own XML layout; ids and loan state in the file are
+# ignored, imported publications are new and available.
+def read_xml(path: str) -> Iterator[Tuple[int, Dict]]:
+    row = 0
+    with open(path, 'rb') as f:
+        root = None
+        for event, el in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = el
+                continue
+            if el.tag != 'publication':
+                continue
+            row += 1
+            record = {k: el.findtext(k, '') for k in FIELDS[1:]}
+            record['type'] = el.attrib.get('type', '')
+            yield row, record
+            root.clear()
+
+
+READERS = {'.csv': read_csv, '.jsonl': read_jsonl, '.ndjson': read_jsonl, '.xml': read_xml}
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f'Nepodržana vrsta datoteke: {path}')
+    return reader(path)
@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from atomic import fsync_dir
+from models import Publication
+
+JOURNAL_SUFFIX = '.journal'
+STAGED_SUFFIX = '.next'
+
+
+def journal_path(catalogue_path: str) -> str:
+    return catalogue_path + JOURNAL_SUFFIX
+
+
+def staged_journal_path(catalogue_path: str) -> str:
+    return journal_path(catalogue_path) + STAGED_SUFFIX
+
+
+# Identifies the catalogue file a journal was started on. After compaction the
+# catalogue is rewritten first and the journal reset second; if the app dies
+# in between, the journal still names the old file and is not replayed twice.
+def file_token(path: str) -> str:
+    st = os.stat(path)
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+# Returns the records to replay on top of the catalogue and the byte offset of
+# the last complete record. A journal started on another version of the
+# catalogue yields nothing; a torn last line from a crash is ignored.
+def read_journal(path: str, base_token: str) -> Tuple[List[Dict], int]:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    records = []
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            break
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            break
+        if offset == 0 and rec.get('base') != base_token:
+            return [], 0
+        if offset:
+            records.append(rec)
+        offset += len(line)
+    return records, offset
+
+
+def apply_record(publications: Dict[int, Publication], rec: Dict) -> Optional[Publication]:
+    op = rec['op']
+    if op == 'add':
+        if rec['id'] in publications:
+            return None
+        pub = Publication(rec['id'], rec['type'], rec['title'], rec['author_or_publisher'], rec['year'])
+        publications[pub.id] = pub
+        return pub
+    if op == 'import':
+        for pid, typ, title, aop, year in rec['publications']:
+            if pid not in publications:
+                publications[pid] = Publication(pid, typ, title, aop, year)
+        return None
+    pub = publications.get(rec['id'])
+    if pub is None:
+        return None
+    if op == 'borrow' and pub.available:
+        pub.available = False
+        pub.borrowed_to = rec['user']
+        pub.borrow_date = rec['date']
+        pub.history.append({'user': rec['user'], 'date': rec['date'], 'action': 'posudba'})
+    elif op == 'return' and not pub.available:
+        pub.history.append({'user': pub.borrowed_to, 'date': rec['date'], 'action': 'vraćanje'})
+        pub.available = True
+        pub.borrowed_to = ''
+        pub.borrow_date = ''
+    elif op == 'delete':
+        del publications[pub.id]
+    return pub
+
+
+# A save writes the journal of the file it is about to rename into place
+# before the rename: a header naming that file and the records of desk
+# actions made during the save, fsynced. Returns its size in bytes.
+def stage_journal(catalogue_path: str, base_token: str, records: List[Dict]) -> int:
+    lines = [json.dumps({'base': base_token})] + [json.dumps(rec, ensure_ascii=False) for rec in records]
+    data = ''.join(line + '\n' for line in lines).encode('utf-8')
+    with open(staged_journal_path(catalogue_path), 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(data)
+
+
+def commit_staged_journal(catalogue_path: str):
+    os.replace(staged_journal_path(catalogue_path), journal_path(catalogue_path))
+    fsync_dir(os.path.dirname(os.path.abspath(catalogue_path)))
+
+
+# A staged journal left by a crash belongs to the catalogue if it names it:
+# the save died between renaming the catalogue and its journal, and the
+# rename is finished now. Otherwise the catalogue was never replaced and
+# the staged journal is dropped.
+def recover_journal(catalogue_path: str):
+    staged = staged_journal_path(catalogue_path)
+    try:
+        with open(staged, 'rb') as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return
+    try:
+        base = json.loads(header).get('base')
+    except ValueError:
+        base = None
+    if base is not None and base == file_token(catalogue_path):
+        commit_staged_journal(catalogue_path)
+    else:
+        os.remove(staged)
+
+
+# Replays the journal next to `catalogue_path` onto its publications. Returns
+# the next free id and, for reopening the journal, the offset of its last
+# complete record and the number of records replayed.
+def replay_journal(catalogue_path: str, publications: Dict[int, Publication],
+                   next_id: int) -> Tuple[int, int, int]:
+    recover_journal(catalogue_path)
+    records, keep_bytes = read_journal(journal_path(catalogue_path), file_token(catalogue_path))
+    for rec in records:
+        apply_record(publications, rec)
+        if rec['op'] == 'add':
+            next_id = max(next_id, rec['id'] + 1)
+        elif rec['op'] == 'import' and rec['publications']:
+            next_id = max(next_id, rec['publications'][-1][0] + 1)
+    return next_id, keep_bytes, len(records)
+
+
+class Journal:
+    # Append-only log of desk actions next to the catalogue file. Each record is
+    # one JSON line written with a single os.write; a background thread fsyncs
+    # whatever has been written since its last fsync, so records appended
+    # together share one flush (group commit). append(wait=True) returns once
+    # the record is on disk. If an fsync fails the commit thread stops, and
+    # that append and every later one raise OSError: nothing after it can be
+    # acknowledged as durable.
+
+    def __init__(self, path: str, base_token: str, keep_bytes: int = 0, records: int = 0):
+        self.path = path
+        self.records = records
+        exists = keep_bytes > 0 and os.path.exists(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if exists:
+            os.truncate(path, keep_bytes)
+        else:
+            os.truncate(path, 0)
+            os.write(self._fd, (json.dumps({'base': base_token}) + '\n').encode('utf-8'))
+            os.fsync(self._fd)
+        self._cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._closing = False
+        self._error: Optional[OSError] = None
+        self._thread = threading.Thread(target=self._commit_loop, name='journal-commit', daemon=True)
+        self._thread.start()
+
+    def append(self, rec: Dict, wait: bool = True):
+        line = (json.dumps(rec, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._cond:
+            self._check()
+            os.write(self._fd, line)
+            self._written += 1
+            self.records += 1
+            seq = self._written
+            self._cond.notify_all()
+            if wait:
+                while self._synced < seq and self._error is None:
+                    self._cond.wait()
+                if self._synced < seq:
+                    self._check()
+
+    def _check(self):
+        if self._error is not None:
+            raise OSError(self._error.errno, f'Dnevnik promjena nije zapisan na disk: {self._error.strerror}')
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while self._synced == self._written and not self._closing:
+                    self._cond.wait()
+                if self._synced == self._written:
+                    return
+                target = self._written
+            try:
+                os.fsync(self._fd)
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._synced = target
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        os.close(self._fd)
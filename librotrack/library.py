@@ -0,0 +1,707 @@
+import datetime
+from collections import OrderedDict
+import gc
+import os
+from array import array
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic import fsync_dir
+from journal import (Journal, commit_staged_journal, file_token, journal_path, read_journal, replay_journal,
+                     stage_journal)
+from loans import OVERDUE, DueIndex, is_overdue, today
+from models import Action, History, Publication, date_text
+from patrons import PatronIndex
+from perf import timed
+from search_index import SearchIndex
+from snapshot import is_snapshot, read_snapshot, release_snapshot, write_snapshot
+from sort_index import SortIndex
+from stats import DEBUG, LibraryStats
+from xml_io import read_catalogue_parallel, write_catalogue
+
+# The SQLite engine, the importer and the history viewer's index are imported
+# where they are used, so the core loads without sqlite3, csv and dataclasses.
+if TYPE_CHECKING:
+    from history_index import HistoryFilter
+    from importer import ImportReport
+    from sqlite_store import SqliteLibrary
+
+JOURNAL_COMPACT_RECORDS = 10000
+# A save in memory mode writes the catalogue next to its path under this
+# suffix; end_save renames it into place once its journal is on disk.
+SAVING_SUFFIX = '.saving'
+HISTORY_INDEX_CACHE = 16
+
+
+class LibraryError(Exception):
+    pass
+
+
+class ValidationError(LibraryError):
+    pass
+
+
+# The rules the add form has always applied: a title is required and the
+# year, if given, is digits only. Returns the stripped values.
+def validate_publication(title: str, author_or_publisher: str, year: str) -> Tuple[str, str, str]:
+    title, author_or_publisher, year = title.strip(), author_or_publisher.strip(), year.strip()
+    if not title:
+        raise ValidationError('Naslov ne smije biti prazan')
+    if year and not year.isdigit():
+        raise ValidationError('Godina mora sadržavati isključivo brojke')
+    return title, author_or_publisher, year
+
+
+# The table filter as a plain predicate; q must already be lowered.
+def matches(p: Publication, typ: str, stat: str, q: str) -> bool:
+    if typ != 'Sve' and p.type != typ:
+        return False
+    if stat == 'Dostupno' and not p.available:
+        return False
+    if stat == 'Posuđeno' and p.available:
+        return False
+    if stat == OVERDUE and not is_overdue(p):
+        return False
+    return not q or q in p.title.lower() or q in p.author_or_publisher.lower()
+
+
+def _copy(pub: Publication) -> Publication:
+    h = pub.history
+    history = History.from_columns(array('I', h.users), array('i', h.days), array('H', h.actions))
+    return Publication(pub.id, pub.type, pub.title, pub.author_or_publisher, pub.year, pub.available,
+                       pub.borrowed_to, pub.borrow_date, history)
+
+
+def _database_publications(path: str) -> Iterator[Publication]:
+    from sqlite_store import SqliteLibrary
+    db = SqliteLibrary(path)
+    try:
+        yield from db.publications()
+    finally:
+        db.close()
+
+
+class CatalogueSnapshot:
+    # The in-memory catalogue as it was when a save began, readable from a
+    # worker thread while the desk keeps working. It is copy-on-write: the
+    # Library never mutates a publication the snapshot covers, it parks the
+    # original in `originals` first and changes a copy. Journal records made
+    # meanwhile are kept in `records` so the next journal can carry them.
+
+    def __init__(self, publications: Dict[int, Publication], next_id: int):
+        self.live = publications
+        self.ids = list(publications)
+        self.next_id = next_id
+        self.originals: Dict[int, Publication] = {}
+        self.records: List[Dict] = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def covers(self, pub_id: int) -> bool:
+        return pub_id < self.next_id and pub_id not in self.originals
+
+    # The live lookup comes first: the Library parks an original before it
+    # replaces or deletes the live entry, so a miss or a copy in `live` is
+    # always overridden by `originals`.
+    def __iter__(self) -> Iterator[Publication]:
+        live, originals = self.live, self.originals
+        for pid in self.ids:
+            pub = live.get(pid)
+            pub = originals.get(pid, pub)
+            if pub is not None:
+                yield pub
+
+
+class LoadedCatalogue:
+    # A catalogue read and indexed off the UI thread, ready for Library.install.
+
+    def __init__(self, path: str, publications: Dict[int, Publication], next_id: int,
+                 keep_bytes: int, records: int):
+        self.path = path
+        self.publications = publications
+        self.next_id = next_id
+        self.keep_bytes = keep_bytes
+        self.records = records
+        self.search_index = SearchIndex()
+        for pub in publications.values():
+            self.search_index.add(pub)
+        self.stats = LibraryStats(publications.values())
+        self.due_index = DueIndex(publications.values())
+
+
+class Library:
+    # The catalogue and every operation on it, without any UI. It is kept
+    # either in memory (publications, search index, counters and sort indexes,
+    # with desk actions journaled next to the last saved file) or in an
+    # SQLite database. LibraryApp is a Tk front end over this class.
+
+    def __init__(self, on_journal_error: Optional[Callable[[OSError], None]] = None):
+        self.publications: Dict[int, Publication] = {}
+        self.search_index = SearchIndex()
+        self.stats = LibraryStats()
+        self.due_index = DueIndex()
+        self.patrons: Optional[PatronIndex] = PatronIndex()
+        self.history_indexes: OrderedDict = OrderedDict()
+        self.sort_indexes: Dict[str, SortIndex] = {}
+        self.next_id = 1
+        self.db: Optional['SqliteLibrary'] = None
+        self.catalogue_path: Optional[str] = None
+        self.journal: Optional[Journal] = None
+        self.on_journal_error = on_journal_error
+        self.saving: Optional[CatalogueSnapshot] = None
+
+    def get(self, pub_id: int, with_history: bool = False) -> Optional[Publication]:
+        if self.db is not None:
+            return self.db.get(pub_id, with_history)
+        return self.publications.get(pub_id)
+
+    @timed
+    def add(self, type: str, title: str, author_or_publisher: str, year: str) -> Publication:
+        title, author_or_publisher, year = validate_publication(title, author_or_publisher, year)
+        if self.db is not None:
+            pub = self.db.add(type, title, author_or_publisher, year)
+        else:
+            pub = Publication(self.next_id, type, title, author_or_publisher, year)
+            self.next_id += 1
+            self.publications[pub.id] = pub
+            self.search_index.add(pub)
+            self.stats.add(pub)
+            self.log({'op': 'add', 'id': pub.id, 'type': pub.type, 'title': title,
+                      'author_or_publisher': author_or_publisher, 'year': year})
+        for index in self.sort_indexes.values():
+            index.add(pub)
+        return pub
+
+    @timed
+    def borrow(self, pub_id: int, user: str, date: Optional[str] = None) -> Publication:
+        pub = self._writable(pub_id)
+        if not pub.available:
+            raise LibraryError('Publikacija je već posuđena')
+        date = date or datetime.date.today().isoformat()
+        if self.db is not None and not self.db.borrow(pub.id, user, date):
+            raise LibraryError('Publikacija je već posuđena')
+        pub.available = False
+        pub.borrowed_to = user
+        pub.borrow_date = date
+        pub.history.append({'user': user, 'date': date, 'action': 'posudba'})
+        if self.db is None:
+            self.search_index.set_available(pub.id, False)
+            self.stats.borrowed_one(pub)
+            self.due_index.add(pub)
+            self.log({'op': 'borrow', 'id': pub.id, 'user': user, 'date': date})
+        if self.patrons is not None:
+            position = len(pub.history) if self.db is None else self.db.history_length(pub.id)
+            self.patrons.borrowed(pub, position - 1)
+        self._update_sort_indexes(pub)
+        return pub
+
+    @timed
+    def return_publication(self, pub_id: int, date: Optional[str] = None) -> Publication:
+        pub = self._writable(pub_id)
+        if pub.available:
+            raise LibraryError('Publikacija je već dostupna')
+        date = date or datetime.date.today().isoformat()
+        if self.db is not None and not self.db.return_publication(pub.id, date):
+            raise LibraryError('Publikacija je već dostupna')
+        user = pub.borrowed_to
+        pub.available = True
+        pub.borrowed_to = ''
+        pub.borrow_date = ''
+        pub.history.append({'user': user, 'date': date, 'action': 'vraćanje'})
+        if self.db is None:
+            self.search_index.set_available(pub.id, True)
+            self.stats.returned_one(pub)
+            self.due_index.remove(pub.id)
+            self.log({'op': 'return', 'id': pub.id, 'date': date})
+        if self.patrons is not None:
+            self.patrons.returned(pub.id, user)
+        self._update_sort_indexes(pub)
+        return pub
+
+    @timed
+    def delete(self, pub_id: int):
+        pub = self._existing(pub_id)
+        if self.db is not None:
+            self.db.delete(pub.id)
+        else:
+            if self.saving is not None and self.saving.covers(pub.id):
+                self.saving.originals[pub.id] = pub
+            del self.publications[pub.id]
+            self.search_index.remove(pub.id)
+            self.stats.remove(pub)
+            self.due_index.remove(pub.id)
+            self.log({'op': 'delete', 'id': pub.id})
+        if self.patrons is not None:
+            self.patrons.removed(pub)
+        for index in self.sort_indexes.values():
+            index.remove(pub.id)
+
+    # Bulk import of (row number, record) pairs as produced by importer. Rows
+    # are validated with the add form's rules and added IMPORT_BATCH at a
+    # time: one block of ids, one journal record and one sort-index merge per
+    # batch. Rejected rows end up in the report instead of raising.
+    # `progress` receives the number of records read so far.
+    def import_records(self, records: Iterable[Tuple[int, Dict]],
+                       progress: Optional[Callable[[int], None]] = None) -> 'ImportReport':
+        return self.install_import(*self.validate_records(records, progress))
+
+    def import_file(self, path: str, progress: Optional[Callable[[int], None]] = None) -> 'ImportReport':
+        return self.install_import(*self.read_import(path, progress))
+
+    # The reading and validating half of import_file; touches no Library
+    # state, so it can run on a worker thread.
+    @staticmethod
+    @timed
+    def read_import(path: str, progress: Optional[Callable[[int], None]] = None) \
+            -> Tuple[List[Tuple[str, str, str, str]], 'ImportReport']:
+        from importer import read_records
+        return Library.validate_records(read_records(path), progress)
+
+    # Valid rows as (type, title, author_or_publisher, year), with a report
+    # holding the rejected ones.
+    @staticmethod
+    def validate_records(records: Iterable[Tuple[int, Dict]], progress: Optional[Callable[[int], None]] = None) \
+            -> Tuple[List[Tuple[str, str, str, str]], 'ImportReport']:
+        from importer import IMPORT_BATCH, ImportReport
+        report = ImportReport()
+        rows = []
+        for n, (row, record) in enumerate(records, 1):
+            try:
+                rows.append(Library._validate_record(record))
+            except ValidationError as e:
+                report.reject(row, str(e), record)
+            if progress is not None and n % IMPORT_BATCH == 0:
+                progress(n)
+        return rows, report
+
+    @timed
+    def install_import(self, rows: List[Tuple[str, str, str, str]], report: 'ImportReport') -> 'ImportReport':
+        from importer import IMPORT_BATCH
+        for start in range(0, len(rows), IMPORT_BATCH):
+            self._import_batch(rows[start:start + IMPORT_BATCH], report)
+        return report
+
+    @staticmethod
+    def _validate_record(record: Dict) -> Tuple[str, str, str, str]:
+        if '_error' in record:
+            raise ValidationError(record['_error'])
+        from importer import normalise_type
+        typ = normalise_type(record.get('type', ''))
+        if not typ:
+            raise ValidationError(f"Nepoznat tip publikacije: {record.get('type')}")
+        return (typ,) + validate_publication(record.get('title', ''), record.get('author_or_publisher', ''),
+                                             record.get('year', ''))
+
+    def _import_batch(self, batch: List[Tuple[str, str, str, str]], report: 'ImportReport'):
+        if not batch:
+            return
+        start = self.db.next_id if self.db is not None else self.next_id
+        pubs = [Publication(pid, *fields) for pid, fields in enumerate(batch, start)]
+        if self.db is not None:
+            self.db.import_publications(pubs, start + len(pubs))
+        else:
+            self.next_id = start + len(pubs)
+            for pub in pubs:
+                self.publications[pub.id] = pub
+                self.search_index.add(pub)
+                self.stats.add(pub)
+            self.log({'op': 'import', 'publications': [[p.id, p.type, p.title, p.author_or_publisher, p.year]
+                                                       for p in pubs]})
+        for index in self.sort_indexes.values():
+            index.add_many(pubs)
+        report.added += len(pubs)
+
+    def _existing(self, pub_id: int) -> Publication:
+        pub = self.get(pub_id)
+        if pub is None:
+            raise LibraryError(f'Publikacija {pub_id} ne postoji')
+        return pub
+
+    # The publication to mutate. While a save is running, one the snapshot
+    # still shares is swapped for a copy first.
+    def _writable(self, pub_id: int) -> Publication:
+        pub = self._existing(pub_id)
+        saving = self.saving
+        if self.db is None and saving is not None and saving.covers(pub_id):
+            saving.originals[pub_id] = pub
+            pub = self.publications[pub_id] = _copy(pub)
+        return pub
+
+    def _update_sort_indexes(self, pub: Publication):
+        for index in self.sort_indexes.values():
+            index.update(pub)
+
+    # Type and status come from the index's row masks, text from its trigram
+    # postings. Ids are in catalogue order.
+    @timed
+    def filter(self, typ: str = 'Sve', stat: str = 'Sve', q: str = '') -> List[int]:
+        if self.db is not None:
+            return self.db.filter_ids(typ, stat, q)
+        if stat == OVERDUE:
+            pubs = self.publications
+            ids = [pid for pid in self.due_index.overdue(today()) if matches(pubs[pid], typ, 'Sve', q)]
+            ids.sort(key=self.search_index.position)
+            return ids
+        return self.search_index.filter(typ, stat, q)
+
+    # Overdue loans come off the due-date index; the overdue filter only
+    # looks at those k publications, not the catalogue.
+    def overdue(self, day: Optional[int] = None) -> List[int]:
+        day = day or today()
+        if self.db is not None:
+            return self.db.overdue_ids(day)
+        return self.due_index.overdue(day)
+
+    def count_overdue(self, day: Optional[int] = None) -> int:
+        day = day or today()
+        if self.db is not None:
+            return self.db.count_overdue(day)
+        return self.due_index.count_overdue(day)
+
+    # Loans that were not overdue on day `since` but are on `day`.
+    def newly_overdue(self, since: int, day: Optional[int] = None) -> List[int]:
+        day = day or today()
+        if self.db is not None:
+            return self.db.overdue_ids(day, since)
+        return self.due_index.due_between(since, day)
+
+    # Sort indexes are built the first time their column is sorted on and
+    # maintained by the desk actions from then on.
+    def sort_index(self, column: str) -> SortIndex:
+        index = self.sort_indexes.get(column)
+        if index is None:
+            if self.db is not None:
+                pubs = self.db.publications(with_history=False)
+            else:
+                pubs = self.publications.values()
+            index = self.sort_indexes[column] = SortIndex(column, pubs)
+        return index
+
+    # Newest-first pages of one publication's history for the history viewer.
+    # Opening costs the same for any history; a filter goes through that
+    # history's HistoryIndex, kept for the last HISTORY_INDEX_CACHE viewed.
+    def history_pager(self, pub_id: int, f: Optional['HistoryFilter'] = None):
+        from history_index import HistoryFilter, HistoryIndex, HistoryPager
+        f = f or HistoryFilter()
+        if self.db is not None:
+            return self.db.history_pager(pub_id, f)
+        history = self._existing(pub_id).history
+        if not f:
+            return HistoryPager(history)
+        index = self.history_indexes.pop(pub_id, None)
+        if index is None or index.history is not history:
+            index = HistoryIndex(history)
+        self.history_indexes[pub_id] = index
+        if len(self.history_indexes) > HISTORY_INDEX_CACHE:
+            self.history_indexes.popitem(last=False)
+        return HistoryPager(history, index.positions(f))
+
+    # Built on the first patron lookup after a load or in database mode, as
+    # it walks every history; maintained by borrow, return and delete from
+    # then on.
+    def patron_index(self) -> PatronIndex:
+        if self.patrons is None:
+            if self.db is not None:
+                pubs = self.db.publications()
+            else:
+                pubs = self.publications.values()
+            self.patrons = PatronIndex(pubs)
+        return self.patrons
+
+    def find_patrons(self, text: str) -> List[str]:
+        return self.patron_index().find(text)
+
+    def holdings(self, user: str) -> List[Publication]:
+        return [self.get(pid) for pid in self.patron_index().holding(user)]
+
+    # The user's borrows, newest first, as (publication, borrow date, return
+    # date); the return date is '' while the loan is open. Each comes from
+    # its pointer into one publication's history, not from a scan.
+    def patron_history(self, user: str) -> List[Tuple[Publication, str, str]]:
+        loans = []
+        for pid, position in self.patron_index().borrows(user):
+            pub = self.get(pid, with_history=True)
+            if pub is None:
+                continue
+            history = pub.history
+            returned = 0
+            for j in range(position + 1, len(history)):
+                if history.actions[j] == Action.VRACANJE:
+                    returned = history.days[j]
+                    break
+                if history.actions[j] == Action.POSUDBA:
+                    break
+            loans.append((history.days[position], pub, returned))
+        loans.sort(key=lambda loan: loan[0], reverse=True)
+        return [(pub, date_text(borrowed), date_text(returned)) for borrowed, pub, returned in loans]
+
+    def ordered(self, ids: List[int], column: str, descending: bool = False) -> List[int]:
+        ids = self.sort_index(column).ordered(ids)
+        if descending:
+            ids.reverse()
+        return ids
+
+    # Catalogue order: insertion order in memory, id order in a database.
+    def position(self, pub_id: int) -> int:
+        if self.db is not None:
+            return pub_id
+        return self.search_index.position(pub_id)
+
+    def counts(self) -> Tuple[int, int]:
+        if self.db is not None:
+            return self.db.counts()
+        if DEBUG:
+            self.stats.verify(self.publications.values())
+        return self.stats.total, self.stats.available
+
+    def catalogue(self) -> Tuple[Iterable[Publication], int, int]:
+        if self.db is not None:
+            total, _ = self.db.counts()
+            return self.db.publications(), self.db.next_id, total
+        return self.publications.values(), self.next_id, len(self.publications)
+
+    # The publications for a reader on a worker thread, and how many: in
+    # memory a list taken now, in database mode rows read through the
+    # worker's own connection.
+    def circulation_source(self) -> Tuple[Iterable[Publication], int]:
+        if self.db is not None:
+            total, _ = self.db.counts()
+            return _database_publications(self.db.path), total
+        return list(self.publications.values()), len(self.publications)
+
+    def save(self, path: str, snapshot: bool = False, progress: Optional[Callable[[float], None]] = None):
+        saving = self.begin_save()
+        try:
+            self.write_save(saving, path, snapshot, progress)
+        except BaseException:
+            self.end_save(saving)
+            raise
+        self.end_save(saving, path)
+
+    # A save in three steps, so that write_save can run on a worker thread:
+    # begin_save and end_save belong on the thread that makes desk actions.
+    # In database mode the worker reads through its own connection inside one
+    # transaction, which WAL keeps consistent while the desk writes. The
+    # catalogue's objects are frozen out of the cyclic garbage collector for
+    # the duration: a full collection over a million publications would hold
+    # the GIL, and with it the UI thread, for seconds.
+    def begin_save(self) -> Optional[CatalogueSnapshot]:
+        if self.saving is not None:
+            raise LibraryError('Spremanje je već u tijeku')
+        if self.db is not None:
+            return None
+        gc.freeze()
+        self.saving = CatalogueSnapshot(self.publications, self.next_id)
+        return self.saving
+
+    @timed
+    def write_save(self, saving: Optional[CatalogueSnapshot], path: str, snapshot: bool = False,
+                   progress: Optional[Callable[[float], None]] = None):
+        if saving is not None:
+            self._write(path + SAVING_SUFFIX, snapshot, saving, saving.next_id, len(saving), progress)
+            return
+        from sqlite_store import SqliteLibrary
+        db = SqliteLibrary(self.db.path)
+        try:
+            db.conn.execute('BEGIN')
+            total, _ = db.counts()
+            release_snapshot(path)
+            self._write(path, snapshot, db.publications(), db.next_id, total, progress)
+            db.conn.execute('COMMIT')
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write(path: str, snapshot: bool, pubs: Iterable[Publication], next_id: int, total: int,
+               progress: Optional[Callable[[float], None]]):
+        if snapshot:
+            write_snapshot(path, pubs, next_id, progress)
+        else:
+            write_catalogue(path, pubs, next_id, total, progress)
+
+    # With `path` the save succeeded: in memory the file becomes the base of
+    # a fresh journal, which starts with the records made during the save.
+    # That journal is on disk before the file is renamed into place, so a
+    # crash at any point leaves a catalogue whose journal holds every
+    # acknowledged desk action (see journal.recover_journal). Without `path`
+    # the save failed and the current journal simply carries on.
+    def end_save(self, saving: Optional[CatalogueSnapshot], path: Optional[str] = None):
+        if saving is None:
+            return
+        self.saving = None
+        gc.unfreeze()
+        if path is None:
+            return
+        written = path + SAVING_SUFFIX
+        if os.path.exists(path):
+            import shutil
+            shutil.copymode(path, written)
+        size = stage_journal(path, file_token(written), saving.records)
+        release_snapshot(path)
+        os.replace(written, path)
+        fsync_dir(os.path.dirname(os.path.abspath(path)))
+        # Windows will not replace a file that is open.
+        self.close_journal()
+        commit_staged_journal(path)
+        self.start_journal(path, size, len(saving.records))
+
+    # Loads a catalogue file and replays its journal on top of it, so desk
+    # actions made after the last save survive a crash. Raises LoadCancelled
+    # when `cancelled` says so, leaving the current catalogue untouched.
+    def load(self, path: str, progress: Optional[Callable[[float], None]] = None,
+             cancelled: Optional[Callable[[], bool]] = None):
+        self.install(self.read(path, progress, cancelled))
+
+    # The reading and indexing half of load; touches no Library state, so it
+    # can run on a worker thread.
+    @staticmethod
+    @timed
+    def read(path: str, progress: Optional[Callable[[float], None]] = None,
+             cancelled: Optional[Callable[[], bool]] = None) -> LoadedCatalogue:
+        if is_snapshot(path):
+            pubs, next_id = read_snapshot(path, progress, lazy_history=True)
+        else:
+            pubs, next_id = read_catalogue_parallel(path, progress, cancelled)
+        publications = {pub.id: pub for pub in pubs}
+        next_id, keep_bytes, records = replay_journal(path, publications, next_id)
+        return LoadedCatalogue(path, publications, next_id, keep_bytes, records)
+
+    @timed
+    def install(self, loaded: LoadedCatalogue):
+        if self.saving is not None:
+            raise LibraryError('Spremanje je u tijeku')
+        self.close_database()
+        self.close_journal()
+        self._clear()
+        self.publications = loaded.publications
+        self.search_index = loaded.search_index
+        self.stats = loaded.stats
+        self.due_index = loaded.due_index
+        self.next_id = loaded.next_id
+        # Desk actions made while the file was being read may have gone to
+        # this same journal. They are replayed here, with the journal
+        # closed so nothing is logged twice, and the journal is reopened
+        # past them instead of cut back to where the read stopped.
+        path = loaded.path
+        records, keep_bytes = read_journal(journal_path(path), file_token(path))
+        if keep_bytes < loaded.keep_bytes:
+            records, keep_bytes = [], loaded.keep_bytes
+        for rec in records[loaded.records:]:
+            self._replay(rec)
+        self.start_journal(path, keep_bytes, max(len(records), loaded.records))
+
+    # Applies one journal record through the desk actions, keeping every
+    # index up to date. Records that no longer apply are skipped, as
+    # apply_record skips them on load.
+    def _replay(self, rec: Dict):
+        op = rec['op']
+        try:
+            if op in ('add', 'import'):
+                from importer import ImportReport
+                rows = rec['publications'] if op == 'import' else \
+                    [[rec['id'], rec['type'], rec['title'], rec['author_or_publisher'], rec['year']]]
+                rows = [row for row in rows if self.get(row[0]) is None]
+                if rows and self.db is not None:
+                    self.db.import_publications([Publication(*row) for row in rows], rows[-1][0] + 1)
+                elif rows:
+                    next_id = self.next_id
+                    self.next_id = rows[0][0]
+                    self._import_batch([tuple(row[1:]) for row in rows], ImportReport())
+                    self.next_id = max(next_id, self.next_id)
+            elif op == 'borrow':
+                self.borrow(rec['id'], rec['user'], rec['date'])
+            elif op == 'return':
+                self.return_publication(rec['id'], rec['date'])
+            elif op == 'delete':
+                self.delete(rec['id'])
+        except LibraryError:
+            pass
+
+    def _clear(self):
+        self.publications.clear()
+        self.search_index.clear()
+        self.sort_indexes.clear()
+        self.stats.rebuild(())
+        self.due_index = DueIndex()
+        self.patrons = None
+        self.history_indexes.clear()
+        self.next_id = 1
+
+    def start_journal(self, path: str, keep_bytes: int = 0, records: int = 0):
+        self.close_journal()
+        self.catalogue_path = path
+        self.journal = Journal(journal_path(path), file_token(path), keep_bytes, records)
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    # A journal write that fails does not undo the action it records; the
+    # error goes to on_journal_error, or is raised when there is none.
+    # During a save the record also goes to the save, for the journal of the
+    # file being written.
+    def log(self, rec: Dict):
+        if self.saving is not None:
+            self.saving.records.append(rec)
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(rec)
+        except OSError as e:
+            if self.on_journal_error is None:
+                raise
+            self.on_journal_error(e)
+
+    @property
+    def journal_full(self) -> bool:
+        return self.journal is not None and self.journal.records >= JOURNAL_COMPACT_RECORDS
+
+    # Folds the journal back into the catalogue file it was started on.
+    def compact_journal(self, progress: Optional[Callable[[float], None]] = None):
+        if self.journal_full:
+            self.save(self.catalogue_path, is_snapshot(self.catalogue_path), progress)
+
+    def open_database(self, path: str):
+        from sqlite_store import SqliteLibrary
+        self.use_database(SqliteLibrary(path))
+
+    def migrate(self, src_path: str, db_path: str, progress: Optional[Callable[[float], None]] = None):
+        self.finish_migration(src_path, db_path, self.write_database(src_path, db_path, progress))
+
+    # Builds the database from a catalogue file and its journal without
+    # touching the library, so it can run on a worker thread. Returns how
+    # many journal records went in, for finish_migration.
+    @staticmethod
+    def write_database(src_path: str, db_path: str, progress: Optional[Callable[[float], None]] = None) -> int:
+        from sqlite_store import migrate_catalogue
+        db, records = migrate_catalogue(src_path, db_path, progress)
+        db.close()
+        return records
+
+    # Switches to the database write_database built. Desk actions journaled
+    # against the source after it was read are applied to the database too.
+    def finish_migration(self, src_path: str, db_path: str, records: int):
+        self.open_database(db_path)
+        later, _ = read_journal(journal_path(src_path), file_token(src_path))
+        for rec in later[records:]:
+            self._replay(rec)
+
+    def use_database(self, db: 'SqliteLibrary'):
+        if self.saving is not None:
+            db.close()
+            raise LibraryError('Spremanje je u tijeku')
+        self.close_database()
+        self.close_journal()
+        self.catalogue_path = None
+        self._clear()
+        self.db = db
+
+    def close_database(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def close(self):
+        self.close_journal()
+        self.close_database()
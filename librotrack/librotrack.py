@@ -1,75 +1,61 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
-import datetime
-import xml.etree.ElementTree as ET
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional
-
-@dataclass
-class Publication:
-    id: int
-    type: str
-    title: str
-    author_or_publisher: str
-    year: str
-    available: bool = True
-    borrowed_to: str = ''
-    borrow_date: str = ''
-    history: List[Dict] = field(default_factory=list)
-
-    def status_text(self) -> str:
-        return 'Dostupno' if self.available else f'Posuđeno ({self.borrowed_to})'
-
-    def to_xml_element(self) -> ET.Element:
-        el = ET.Element('publication', attrib={'id': str(self.id), 'type': self.type})
-        ET.SubElement(el, 'title').text = self.title
-        ET.SubElement(el, 'author_or_publisher').text = self.author_or_publisher
-        ET.SubElement(el, 'year').text = self.year
-        ET.SubElement(el, 'available').text = '1' if self.available else '0'
-        ET.SubElement(el, 'borrowed_to').text = self.borrowed_to
-        ET.SubElement(el, 'borrow_date').text = self.borrow_date
-        hist_el = ET.SubElement(el, 'history')
-        for h in self.history:
-            entry = ET.SubElement(hist_el, 'entry')
-            ET.SubElement(entry, 'user').text = h.get('user','')
-            ET.SubElement(entry, 'date').text = h.get('date','')
-            ET.SubElement(entry, 'action').text = h.get('action','')
-        return el
-
-    @staticmethod
-    def from_xml_element(el: ET.Element):
-        id = int(el.attrib.get('id','0'))
-        type = el.attrib.get('type','Knjiga')
-        title = el.findtext('title','')
-        aop = el.findtext('author_or_publisher','')
-        year = el.findtext('year','')
-        available = el.findtext('available','1') == '1'
-        borrowed_to = el.findtext('borrowed_to','')
-        borrow_date = el.findtext('borrow_date','')
-        history = []
-        hist_el = el.find('history')
-        if hist_el is not None:
-            for entry in hist_el.findall('entry'):
-                history.append({
-                    'user': entry.findtext('user',''),
-                    'date': entry.findtext('date',''),
-                    'action': entry.findtext('action','')
-                })
-        return Publication(id, type, title, aop, year, available, borrowed_to, borrow_date, history)
+import os
+from typing import List, Optional
+
+from analytics import REPORTS, CirculationColumns, Report
+from history_index import HistoryFilter, HistoryFilterError
+from library import Library, LibraryError, ValidationError, matches
+from loans import OVERDUE, is_overdue, today
+from models import Publication
+import perf
+from snapshot import SNAPSHOT_EXT, is_snapshot
+from sort_index import Descending
+from sqlite_store import DB_EXT
+from tasks import BackgroundTask
+from virtual_tree import VirtualTreeview
+from xml_io import LoadCancelled
+
+SEARCH_DELAY_MS = 150
+TASK_POLL_MS = 40
+# Imported rows are added on the UI thread this many per event, so the
+# window keeps repainting and the desk keeps working during a large import.
+IMPORT_CHUNK = 500
+OVERDUE_TICK_MS = 60_000
+PERF_REFRESH_MS = 1000
+PROFILE_OPERATIONS = 20
+SESSION_FILE = os.path.join(os.path.expanduser('~'), '.librotrack_session')
+HEADINGS = {'title': 'Naslov', 'author': 'Autor / Izdavač', 'year': 'Godina', 'status': 'Status'}
 
 class LibraryApp(tk.Tk):
-    def __init__(self):
+    # restore=False skips reopening the last session's catalogue, for
+    # benchmarks that must not touch the user's files.
+    def __init__(self, restore: bool = True):
         super().__init__()
         self.title('LibroTrack — Školska knjižnica')
         self.geometry('1000x600')
         self.minsize(900, 520)
 
-        self.publications: List[Publication] = []
-        self.next_id = 1
+        self.library = Library(on_journal_error=self.show_journal_error)
+        self.sort_column: Optional[str] = None
+        self.sort_descending = False
+        self.view_filter = ('Sve', 'Sve', '')
+        self._search_job = None
+        self._task: Optional[BackgroundTask] = None
+        self._task_label = ''
+        self._task_describe = None
+        self._importing = False
+        self._quit_pending = False
+        self._overdue_day = today()
+        self.new_overdue = set()
 
         self.setup_styles()
         self.create_widgets()
         self.update_status_bar()
+        self.protocol('WM_DELETE_WINDOW', self.quit_app)
+        if restore:
+            self.after_idle(self.restore_session)
+        self.after(OVERDUE_TICK_MS, self.overdue_tick)
 
     def setup_styles(self):
         style = ttk.Style(self)
@@ -143,13 +129,16 @@ class LibraryApp(tk.Tk):
 
         ttk.Label(left, text='Status:').pack(anchor=tk.W, pady=(8,0))
         self.filter_status = tk.StringVar(value='Sve')
-        ttk.Combobox(left, textvariable=self.filter_status, values=['Sve','Dostupno','Posuđeno'], state='readonly').pack(anchor=tk.W)
+        ttk.Combobox(left, textvariable=self.filter_status, values=['Sve','Dostupno','Posuđeno',OVERDUE], state='readonly').pack(anchor=tk.W)
+        self.highlight_overdue = tk.BooleanVar(value=True)
+        ttk.Checkbutton(left, text='Označi zakašnjele posudbe', variable=self.highlight_overdue,
+                        command=lambda: self.table.render()).pack(anchor=tk.W, pady=(6,0))
 
         ttk.Label(left, text='Traži (naslov / autor):').pack(anchor=tk.W, pady=(8,0))
         self.search_var = tk.StringVar()
         se = ttk.Entry(left, textvariable=self.search_var, width=30)
         se.pack(anchor=tk.W)
-        se.bind('<KeyRelease>', lambda e: self.refresh_tree())
+        se.bind('<KeyRelease>', lambda e: self.schedule_refresh())
 
         ttk.Button(left, text='Primijeni filtre', command=self.refresh_tree).pack(pady=(10,0), fill=tk.X)
 
@@ -161,12 +150,13 @@ class LibraryApp(tk.Tk):
         ttk.Label(header, text='Publikacije', style='Header.TLabel').pack(side=tk.LEFT)
 
         columns = ('id', 'title', 'author', 'year', 'status')
-        self.tree = ttk.Treeview(right, columns=columns, show='headings', style='mystyle.Treeview')
+        self.table = VirtualTreeview(right, columns, self.row_values, row_tags=self.row_tags, style='mystyle.Treeview')
+        self.tree = self.table.tree
+        self.tree.tag_configure('overdue', foreground=self.warning)
+        self.tree.tag_configure('new_overdue', background=self.warning, foreground='#ffffff')
 
-        self.tree.heading('title', text='Naslov')
-        self.tree.heading('author', text='Autor / Izdavač')
-        self.tree.heading('year', text='Godina')
-        self.tree.heading('status', text='Status')
+        for column, text in HEADINGS.items():
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
 
         self.tree.column('id', width=0, stretch=False)
         self.tree.column('title', width=360)
@@ -174,7 +164,7 @@ class LibraryApp(tk.Tk):
         self.tree.column('year', width=80)
         self.tree.column('status', width=140)
 
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.table.pack(fill=tk.BOTH, expand=True)
 
         self.tree.bind('<Double-1>', lambda e: self.show_history())
 
@@ -183,63 +173,62 @@ class LibraryApp(tk.Tk):
         ttk.Button(btn_frame, text='Posudi', command=self.borrow_selected).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text='Vrati', command=self.return_selected).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text='Povijest', command=self.show_history).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btn_frame, text='Korisnici', command=self.show_patrons).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text='Izbriši', command=self.delete_selected).pack(side=tk.LEFT, padx=6)
 
         self.status_var = tk.StringVar()
-        statusbar = ttk.Label(self, textvariable=self.status_var, anchor=tk.W, padding=6)
+        statusbar = ttk.Frame(self, padding=6)
         statusbar.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Label(statusbar, textvariable=self.status_var, anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progress = ttk.Progressbar(statusbar, length=200, maximum=1.0)
 
         menubar = tk.Menu(self)
         filemenu = tk.Menu(menubar, tearoff=0)
         filemenu.add_command(label='Spremi...', command=self.save_xml)
+        filemenu.add_command(label='Spremi snimku...', command=self.save_snapshot)
         filemenu.add_command(label='Učitaj...', command=self.load_xml)
+        filemenu.add_command(label='Uvezi publikacije...', command=self.import_publications)
         filemenu.add_separator()
-        filemenu.add_command(label='Izlaz', command=self.quit)
+        filemenu.add_command(label='Otvori bazu...', command=self.open_database)
+        filemenu.add_command(label='Prenesi u bazu...', command=self.migrate_to_database)
+        filemenu.add_separator()
+        filemenu.add_command(label='Izlaz', command=self.quit_app)
         menubar.add_cascade(label='Datoteka', menu=filemenu)
 
+        reportmenu = tk.Menu(menubar, tearoff=0)
+        for label in REPORTS:
+            reportmenu.add_command(label=label, command=lambda l=label: self.run_report(l))
+        menubar.add_cascade(label='Izvještaji', menu=reportmenu)
+
         helpmenu = tk.Menu(menubar, tearoff=0)
+        helpmenu.add_command(label='Performanse', command=self.show_performance)
         helpmenu.add_command(label='O aplikaciji', command=self.show_about)
         menubar.add_cascade(label='Pomoć', menu=helpmenu)
         self.config(menu=menubar)
 
     def add_publication(self):
-        title = self.title_entry.get().strip()
-        aop = self.aop_entry.get().strip()
-        year = self.year_entry.get().strip()
-
-        if not title:
-            messagebox.showwarning('Greška', 'Naslov ne smije biti prazan')
-            return
-
-        if year and not year.isdigit():
-            messagebox.showerror('Greška', 'Godina mora sadržavati isključivo brojke')
+        try:
+            pub = self.library.add(self.type_var.get(), self.title_entry.get(), self.aop_entry.get(),
+                                   self.year_entry.get())
+        except ValidationError as e:
+            messagebox.showerror('Greška', str(e))
             return
 
-        pub = Publication(self.next_id, self.type_var.get(), title, aop, year)
-        self.next_id += 1
-        self.publications.append(pub)
-
         self.title_entry.delete(0, tk.END)
         self.aop_entry.delete(0, tk.END)
         self.year_entry.delete(0, tk.END)
 
-        self.refresh_tree()
-        self.update_status_bar()
+        self.after_action(pub)
 
     def get_selected_publication(self) -> Optional[Publication]:
-        sel = self.tree.selection()
-        if not sel:
+        pub_id = self.table.selected_id
+        if pub_id is None:
             messagebox.showinfo('Info', 'Nijedna publikacija nije odabrana')
             return None
-        iid = sel[0]
-        try:
-            pub_id = int(self.tree.set(iid, 'id'))
-        except:
-            return None
-        for p in self.publications:
-            if p.id == pub_id:
-                return p
-        return None
+        return self.lookup(pub_id)
+
+    def lookup(self, pub_id: int) -> Optional[Publication]:
+        return self.library.get(pub_id)
 
     def borrow_selected(self):
         pub = self.get_selected_publication()
@@ -251,13 +240,12 @@ class LibraryApp(tk.Tk):
         user = simpledialog.askstring('Posudi', 'Unesite ime učenika / korisnika:')
         if not user:
             return
-        today = datetime.date.today().isoformat()
-        pub.available = False
-        pub.borrowed_to = user
-        pub.borrow_date = today
-        pub.history.append({'user': user, 'date': today, 'action': 'posudba'})
-        self.refresh_tree()
-        self.update_status_bar()
+        self.before_status_change(pub)
+        try:
+            pub = self.library.borrow(pub.id, user)
+        except LibraryError as e:
+            messagebox.showinfo('Info', str(e))
+        self.after_action(pub)
 
     def return_selected(self):
         pub = self.get_selected_publication()
@@ -268,33 +256,145 @@ class LibraryApp(tk.Tk):
             return
         if not messagebox.askyesno('Potvrda', f'Potvrditi vraćanje: {pub.title}?'):
             return
-        today = datetime.date.today().isoformat()
-        user = pub.borrowed_to
-        pub.available = True
-        pub.borrowed_to = ''
-        pub.borrow_date = ''
-        pub.history.append({'user': user, 'date': today, 'action': 'vraćanje'})
-        self.refresh_tree()
-        self.update_status_bar()
-
+        self.before_status_change(pub)
+        try:
+            pub = self.library.return_publication(pub.id)
+        except LibraryError as e:
+            messagebox.showinfo('Info', str(e))
+        self.new_overdue.discard(pub.id)
+        self.after_action(pub)
+
+    # History is shown newest first a page at a time; scrolling near the end
+    # fetches the next page, and the filters re-query instead of hiding rows.
     def show_history(self):
         pub = self.get_selected_publication()
         if not pub:
             return
         hwin = tk.Toplevel(self)
         hwin.title(f'Povijest: {pub.title}')
-        hwin.geometry('480x320')
+        hwin.geometry('560x420')
         hwin.configure(bg=self.panel)
         lbl = ttk.Label(hwin, text=f'Povijest posudbi za: {pub.title}', font=('Segoe UI', 11,'bold'))
         lbl.pack(anchor=tk.W, padx=8, pady=6)
-        lb = tk.Listbox(hwin, bg=self.card, fg=self.fg, selectbackground=self.accent)
-        lb.pack(fill=tk.BOTH, expand=True, padx=8, pady=6)
-        if not pub.history:
-            lb.insert(tk.END, 'Prazna povijest')
-        else:
-            for e in pub.history:
-                lb.insert(tk.END, f"{e.get('date')} — {e.get('action')} — {e.get('user')}")
-        ttk.Button(hwin, text='Zatvori', command=hwin.destroy).pack(pady=6)
+
+        filters = ttk.Frame(hwin, padding=(8,0))
+        filters.pack(fill=tk.X)
+        user, action, start, end = tk.StringVar(), tk.StringVar(value='Sve'), tk.StringVar(), tk.StringVar()
+        ttk.Label(filters, text='Korisnik:').grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(filters, textvariable=user, width=18).grid(row=0, column=1, padx=(4,10))
+        ttk.Label(filters, text='Radnja:').grid(row=0, column=2, sticky=tk.W)
+        ttk.Combobox(filters, textvariable=action, values=['Sve', 'posudba', 'vraćanje'], width=10,
+                     state='readonly').grid(row=0, column=3, padx=(4,0))
+        ttk.Label(filters, text='Od:').grid(row=1, column=0, sticky=tk.W, pady=(4,0))
+        ttk.Entry(filters, textvariable=start, width=18).grid(row=1, column=1, padx=(4,10), pady=(4,0))
+        ttk.Label(filters, text='Do:').grid(row=1, column=2, sticky=tk.W, pady=(4,0))
+        ttk.Entry(filters, textvariable=end, width=12).grid(row=1, column=3, padx=(4,0), pady=(4,0))
+
+        body = ttk.Frame(hwin, padding=8)
+        body.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(body, columns=('date', 'action', 'user'), show='headings', style='mystyle.Treeview')
+        for column, text, width in (('date', 'Datum', 110), ('action', 'Radnja', 100), ('user', 'Korisnik', 260)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        count_var = tk.StringVar()
+        ttk.Label(hwin, textvariable=count_var).pack(anchor=tk.W, padx=8)
+        state = {'pager': None, 'pending': False}
+
+        def fetch_more():
+            state['pending'] = False
+            pager = state['pager']
+            for who, date, what in pager.fetch():
+                tree.insert('', tk.END, values=(date, what, who))
+            shown = len(tree.get_children())
+            if not shown:
+                count_var.set('Prazna povijest')
+            else:
+                count_var.set(f'Prikazano: {shown}' + ('' if pager.done else ' (pomaknite za još)'))
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            pager = state['pager']
+            if pager is not None and not pager.done and not state['pending'] and float(last) > 0.95:
+                state['pending'] = True
+                tree.after_idle(fetch_more)
+
+        def apply_filters():
+            try:
+                f = HistoryFilter(user.get(), '' if action.get() == 'Sve' else action.get(),
+                                  start.get().strip(), end.get().strip())
+                state['pager'] = self.library.history_pager(pub.id, f)
+            except (HistoryFilterError, LibraryError) as e:
+                messagebox.showerror('Greška', str(e), parent=hwin)
+                return
+            tree.delete(*tree.get_children())
+            fetch_more()
+
+        tree.configure(yscrollcommand=on_scroll)
+        buttons = ttk.Frame(hwin, padding=(8,0,8,8))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text='Primijeni filtre', command=apply_filters).pack(side=tk.LEFT)
+        ttk.Button(buttons, text='Zatvori', command=hwin.destroy).pack(side=tk.RIGHT)
+        apply_filters()
+
+    # Patron lookup: names matching the search on the left; what the selected
+    # patron holds now and everything they borrowed before on the right.
+    def show_patrons(self):
+        win = tk.Toplevel(self)
+        win.title('Korisnici')
+        win.geometry('820x480')
+        win.configure(bg=self.panel)
+
+        left = ttk.Frame(win, padding=8)
+        left.pack(side=tk.LEFT, fill=tk.Y)
+        ttk.Label(left, text='Traži korisnika:').pack(anchor=tk.W)
+        query = tk.StringVar()
+        entry = ttk.Entry(left, textvariable=query, width=28)
+        entry.pack(anchor=tk.W)
+        names = tk.Listbox(left, bg=self.card, fg=self.fg, selectbackground=self.accent, exportselection=False)
+        names.pack(fill=tk.BOTH, expand=True, pady=(6,0))
+
+        right = ttk.Frame(win, padding=8)
+        right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        ttk.Label(right, text='Trenutno posuđeno', style='Title.TLabel').pack(anchor=tk.W)
+        held = ttk.Treeview(right, columns=('title', 'date'), show='headings', height=5, style='mystyle.Treeview')
+        held.heading('title', text='Naslov')
+        held.heading('date', text='Posuđeno')
+        held.column('date', width=100, stretch=False)
+        held.pack(fill=tk.X, pady=(4,10))
+        ttk.Label(right, text='Povijest posudbi', style='Title.TLabel').pack(anchor=tk.W)
+        past = ttk.Treeview(right, columns=('title', 'borrowed', 'returned'), show='headings',
+                            style='mystyle.Treeview')
+        past.heading('title', text='Naslov')
+        past.heading('borrowed', text='Posuđeno')
+        past.heading('returned', text='Vraćeno')
+        past.column('borrowed', width=100, stretch=False)
+        past.column('returned', width=100, stretch=False)
+        past.pack(fill=tk.BOTH, expand=True, pady=(4,0))
+
+        def search():
+            names.delete(0, tk.END)
+            for name in self.library.find_patrons(query.get()):
+                names.insert(tk.END, name)
+
+        def show(event=None):
+            sel = names.curselection()
+            if not sel:
+                return
+            user = names.get(sel[0])
+            held.delete(*held.get_children())
+            for pub in self.library.holdings(user):
+                held.insert('', tk.END, values=(pub.title, pub.borrow_date))
+            past.delete(*past.get_children())
+            for pub, borrowed, returned in self.library.patron_history(user):
+                past.insert('', tk.END, values=(pub.title, borrowed, returned or '—'))
+
+        entry.bind('<KeyRelease>', lambda e: search())
+        names.bind('<<ListboxSelect>>', show)
+        search()
+        entry.focus_set()
 
     def delete_selected(self):
         pub = self.get_selected_publication()
@@ -302,72 +402,553 @@ class LibraryApp(tk.Tk):
             return
         if not messagebox.askyesno('Brisanje', f'Želite li izbrisati: {pub.title}?'):
             return
-        self.publications = [p for p in self.publications if p.id != pub.id]
-        self.refresh_tree()
+        self.table.update_item(pub.id, False, self.order_key)
+        self.library.delete(pub.id)
         self.update_status_bar()
+        self.schedule_compaction()
 
+    # Row and status bar refresh after a desk action on `pub`.
+    @perf.timed
+    def after_action(self, pub: Publication):
+        self.update_row(pub)
+        self.update_status_bar()
+        self.schedule_compaction()
+
+    # Only the status column's key depends on availability, so under that sort
+    # the row is taken out under its old key before the action moves it.
+    def before_status_change(self, pub: Publication):
+        if self.sort_column == 'status':
+            self.table.update_item(pub.id, False, self.order_key)
+
+    def schedule_refresh(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.refresh_tree)
+
+    @perf.timed
     def refresh_tree(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for p in self.get_filtered_publications():
-            self.tree.insert('', tk.END, values=(p.id, p.title, p.author_or_publisher, p.year, p.status_text()))
-
-    def get_filtered_publications(self) -> List[Publication]:
-        typ = self.filter_type.get()
-        stat = self.filter_status.get()
-        q = self.search_var.get().lower()
-        res = []
-        for p in self.publications:
-            if typ != 'Sve' and p.type != typ:
-                continue
-            if stat == 'Dostupno' and not p.available:
-                continue
-            if stat == 'Posuđeno' and p.available:
-                continue
-            if q and q not in p.title.lower() and q not in p.author_or_publisher.lower():
-                continue
-            res.append(p)
-        return res
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        self.view_filter = (self.filter_type.get(), self.filter_status.get(), self.search_var.get().lower())
+        ids = self.sorted_ids(self.library.filter(*self.view_filter))
+        if perf.recorder is not None:
+            perf.recorder.record_size('LibraryApp.refresh_tree', len(ids))
+        self.table.set_items(ids)
+
+    def update_row(self, pub: Publication):
+        self.table.update_item(pub.id, self.matches_filter(pub), self.order_key)
+
+    # Clicking a heading sorts by that column; clicking it again reverses the order.
+    def sort_by(self, column: str):
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        for c, text in HEADINGS.items():
+            if c == column:
+                text += ' ▼' if self.sort_descending else ' ▲'
+            self.tree.heading(c, text=text)
+        self.table.set_items(self.sorted_ids(self.table.items))
+
+    def sorted_ids(self, ids: List[int]) -> List[int]:
+        if self.sort_column is None:
+            return ids
+        return self.library.ordered(ids, self.sort_column, self.sort_descending)
+
+    # Table rows follow the sorted column, or else catalogue order.
+    def order_key(self, pub_id: int):
+        if self.sort_column is not None:
+            key = self.library.sort_index(self.sort_column).key(pub_id)
+            return Descending(key) if self.sort_descending else key
+        return self.library.position(pub_id)
+
+    def matches_filter(self, p: Publication) -> bool:
+        return matches(p, *self.view_filter)
+
+    def row_values(self, pub_id: int) -> tuple:
+        p = self.lookup(pub_id)
+        return (p.id, p.title, p.author_or_publisher, p.year, p.status_text())
+
+    def row_tags(self, pub_id: int) -> tuple:
+        if not self.highlight_overdue.get():
+            return ()
+        if not is_overdue(self.lookup(pub_id), self._overdue_day):
+            return ()
+        return ('new_overdue',) if pub_id in self.new_overdue else ('overdue',)
+
+    # Once the date changes, the loans that fell due in between come off the
+    # due-date index and are highlighted until the next day; nothing else in
+    # the catalogue is looked at.
+    def overdue_tick(self):
+        self.after(OVERDUE_TICK_MS, self.overdue_tick)
+        day = today()
+        if day == self._overdue_day or self._task is not None:
+            return
+        ids = self.library.newly_overdue(self._overdue_day, day)
+        self._overdue_day = day
+        self.new_overdue = set(ids)
+        if self.view_filter[1] == OVERDUE:
+            self.refresh_tree()
+        else:
+            self.table.render()
+        self.update_status_bar()
 
+    @perf.timed
     def update_status_bar(self):
-        total = len(self.publications)
-        available = sum(1 for p in self.publications if p.available)
-        self.status_var.set(f'Ukupno: {total} | Dostupno: {available}')
+        total, available = self.library.counts()
+        overdue = self.library.count_overdue(self._overdue_day)
+        text = f'Ukupno: {total} | Dostupno: {available} | Posuđeno: {total - available} | Zakašnjelo: {overdue}'
+        if self.new_overdue:
+            text += f' (danas novih: {len(self.new_overdue)})'
+        self.status_var.set(text)
 
     def show_about(self):
         messagebox.showinfo('O aplikaciji', 'LibroTrack — školska knjižnica\nVerzija: 1.1\nAutor: Agata Galant')
 
+    # Timing histograms of the instrumented operations, refreshed while the
+    # window is open, with a switch for timing and a cProfile capture of the
+    # next N operations. Nothing is measured until timing is switched on.
+    def show_performance(self):
+        win = tk.Toplevel(self)
+        win.title('Performanse')
+        win.geometry('760x620')
+        win.configure(bg=self.panel)
+        top = ttk.Frame(win, padding=8)
+        top.pack(fill=tk.X)
+        enabled = tk.BooleanVar(value=perf.recorder is not None)
+
+        def toggle():
+            if enabled.get():
+                perf.enable()
+            else:
+                perf.disable()
+
+        ttk.Checkbutton(top, text='Mjerenje uključeno', variable=enabled, command=toggle).pack(side=tk.LEFT)
+        profile_state = tk.StringVar()
+        ttk.Label(top, textvariable=profile_state).pack(side=tk.RIGHT)
+
+        body = ttk.Frame(win, padding=(8,0,8,0))
+        body.pack(fill=tk.BOTH, expand=True)
+        columns = ('operation', 'count', 'mean', 'p50', 'p95', 'max')
+        tree = ttk.Treeview(body, columns=columns, show='headings', height=8, style='mystyle.Treeview')
+        for column, text in zip(columns, ('Operacija', 'Poziva', 'Prosjek (ms)', 'p50 (ms)', 'p95 (ms)', 'Max (ms)')):
+            tree.heading(column, text=text)
+            tree.column(column, width=280 if column == 'operation' else 90, anchor=tk.W if column == 'operation' else tk.E)
+        tree.pack(fill=tk.X)
+        details = tk.Text(body, height=18, bg=self.card, fg=self.fg, font='TkFixedFont', wrap=tk.NONE)
+        details.pack(fill=tk.BOTH, expand=True, pady=(8,0))
+
+        # Rows are updated in place so the selection survives a refresh.
+        def render():
+            rec = perf.recorded()
+            if rec is None:
+                return
+            timings, sizes = rec.histograms()
+            for name, h in sorted(timings.items()):
+                values = (name, h.count, f'{h.mean * 1e3:.2f}', f'{h.quantile(0.5) * 1e3:.2f}',
+                          f'{h.quantile(0.95) * 1e3:.2f}', f'{h.max * 1e3:.2f}')
+                if tree.exists(name):
+                    tree.item(name, values=values)
+                else:
+                    tree.insert('', tk.END, iid=name, values=values)
+            lines = []
+            for name in tree.selection():
+                lines += [name] + timings[name].lines(1e3, 'ms') + ['']
+            for name, h in sorted(sizes.items()):
+                lines += [f'{name}: redaka po osvježavanju'] + h.lines() + ['']
+            lines.append(rec.profile_text())
+            text = '\n'.join(lines)
+            if text != details.get('1.0', 'end-1c'):
+                details.delete('1.0', tk.END)
+                details.insert('1.0', text)
+            if rec.profile_left:
+                profile_state.set(f'Profil: čeka još {rec.profile_left} operacija')
+            else:
+                profile_state.set(f'Profil: snimljeno operacija: {len(rec.profiles)}' if rec.profiles else '')
+
+        def tick():
+            if win.winfo_exists():
+                render()
+                win.after(PERF_REFRESH_MS, tick)
+
+        def start_profile():
+            try:
+                n = int(operations.get())
+            except ValueError:
+                messagebox.showerror('Greška', 'Broj operacija mora biti cijeli broj', parent=win)
+                return
+            enabled.set(True)
+            perf.enable().profile_next(max(n, 1))
+            render()
+
+        def clear():
+            rec = perf.recorded()
+            if rec is not None:
+                rec.clear()
+                rec.profile_next(0)
+            tree.delete(*tree.get_children())
+            details.delete('1.0', tk.END)
+
+        def save(kind: str):
+            rec = perf.recorded()
+            if rec is None:
+                return
+            if kind == 'profile':
+                path = filedialog.asksaveasfilename(parent=win, defaultextension='.prof',
+                                                    filetypes=[('cProfile', '*.prof')])
+            else:
+                path = filedialog.asksaveasfilename(parent=win, defaultextension='.json',
+                                                    filetypes=[('JSON', '*.json')])
+            if not path:
+                return
+            try:
+                if kind == 'profile':
+                    if not rec.dump_profile(path):
+                        messagebox.showinfo('Info', 'Profil još nije snimljen', parent=win)
+                else:
+                    rec.dump(path)
+            except OSError as e:
+                messagebox.showerror('Greška', f'Ne mogu spremiti datoteku: {e}', parent=win)
+
+        tree.bind('<<TreeviewSelect>>', lambda e: render())
+        buttons = ttk.Frame(win, padding=8)
+        buttons.pack(fill=tk.X)
+        ttk.Label(buttons, text='Operacija za profil:').pack(side=tk.LEFT)
+        operations = tk.StringVar(value=str(PROFILE_OPERATIONS))
+        ttk.Entry(buttons, textvariable=operations, width=5).pack(side=tk.LEFT, padx=4)
+        ttk.Button(buttons, text='Profiliraj', command=start_profile).pack(side=tk.LEFT)
+        ttk.Button(buttons, text='Zatvori', command=win.destroy).pack(side=tk.RIGHT)
+        ttk.Button(buttons, text='Očisti', command=clear).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(buttons, text='Spremi profil...', command=lambda: save('profile')).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(buttons, text='Spremi mjerenja...', command=lambda: save('timings')).pack(side=tk.RIGHT, padx=4)
+        tick()
+
     def save_xml(self):
         path = filedialog.asksaveasfilename(defaultextension='.xml', filetypes=[('XML files','*.xml')])
         if not path:
             return
-        root = ET.Element('library', attrib={'next_id': str(self.next_id)})
-        for p in self.publications:
-            root.append(p.to_xml_element())
-        tree = ET.ElementTree(root)
+        self.save_file(path)
+
+    def save_snapshot(self):
+        path = filedialog.asksaveasfilename(defaultextension=SNAPSHOT_EXT,
+                                            filetypes=[('LibroTrack snimke', f'*{SNAPSHOT_EXT}')])
+        if not path:
+            return
+        self.save_file(path, snapshot=True)
+
+    # Saves on a worker thread from a copy-on-write snapshot of the catalogue,
+    # so the desk keeps working meanwhile; the result arrives via after().
+    def save_file(self, path: str, snapshot: bool = False, announce: bool = True):
+        if self.busy():
+            return
+        saving = self.library.begin_save()
+
+        def done(task: BackgroundTask):
+            if task.error is not None:
+                self.library.end_save(saving)
+                self.update_status_bar()
+                messagebox.showerror('Greška', f'Ne mogu spremiti datoteku: {task.error}')
+                return
+            try:
+                self.library.end_save(saving, path)
+            except OSError as e:
+                self.update_status_bar()
+                messagebox.showerror('Greška', f'Ne mogu spremiti datoteku: {e}')
+                return
+            if self.library.journal is not None:
+                self.remember_session(path)
+            self.update_status_bar()
+            if announce:
+                messagebox.showinfo('Spremanje', 'Uspješno spremljeno')
+
+        self.run_in_background('Spremanje', lambda task: self.library.write_save(saving, path, snapshot, task.report),
+                               done)
+
+    def show_journal_error(self, e: OSError):
+        messagebox.showerror('Greška', f'Ne mogu zapisati dnevnik promjena: {e}')
+
+    def schedule_compaction(self):
+        if self.library.journal_full:
+            self.after_idle(self.compact_journal)
+
+    # Folds the journal back into its catalogue file with a background save;
+    # while another task runs it waits for the next desk action.
+    def compact_journal(self):
+        if not self.library.journal_full or self._task is not None:
+            return
+        path = self.library.catalogue_path
+        self.save_file(path, is_snapshot(path), announce=False)
+
+    def busy(self) -> bool:
+        if self._task is None and not self._importing:
+            return False
+        messagebox.showinfo('Info', f'{self._task_label} je u tijeku, pričekajte da završi')
+        return True
+
+    # The worker reports a fraction done, or with `describe` any number that
+    # describe turns into the status text; the bar then only shows activity.
+    def run_in_background(self, label: str, work, on_done, describe=None):
+        self._task = BackgroundTask(work)
+        self._task_label = label
+        self._task_describe = describe
+        self.progress['value'] = 0
+        self.progress.pack(side=tk.RIGHT)
+        if describe is not None:
+            self.progress.configure(mode='indeterminate')
+            self.progress.start()
+        self._task.start()
+        self.after(TASK_POLL_MS, self._poll_task, on_done)
+
+    def _poll_task(self, on_done):
+        task = self._task
+        if not task.done:
+            if self._task_describe is not None:
+                self.status_var.set(self._task_describe(task.progress))
+            else:
+                self.progress['value'] = task.progress
+                self.status_var.set(f'{self._task_label}... {task.progress:.0%}')
+            self.after(TASK_POLL_MS, self._poll_task, on_done)
+            return
+        self._task = None
+        self.progress.stop()
+        self.progress.configure(mode='determinate')
+        self.progress.pack_forget()
+        on_done(task)
+        if self._quit_pending:
+            self.quit_app()
+
+    def remember_session(self, path: str):
+        try:
+            with open(SESSION_FILE, 'w', encoding='utf-8') as f:
+                f.write(path)
+        except OSError:
+            pass
+
+    def restore_session(self):
+        try:
+            with open(SESSION_FILE, encoding='utf-8') as f:
+                path = f.read().strip()
+        except OSError:
+            return
+        if path and os.path.exists(path):
+            self.load_file(path, announce=False)
+
+    # A running save is allowed to finish first; a running load is cancelled
+    # and an import stops after the chunk it is adding.
+    def quit_app(self):
+        if self._task is not None or self._importing:
+            self._quit_pending = True
+            if self._task is not None:
+                self._task.cancel()
+            return
+        self.library.close()
+        self.quit()
+
+    def load_xml(self):
+        path = filedialog.askopenfilename(filetypes=[('LibroTrack datoteke', f'*.xml *{SNAPSHOT_EXT}'),
+                                                     ('XML files','*.xml'),
+                                                     ('LibroTrack snimke', f'*{SNAPSHOT_EXT}')])
+        if not path:
+            return
+        self.load_file(path)
+
+    # Reads and indexes the file on a worker thread; only the final swap of
+    # catalogues runs on the UI thread.
+    def load_file(self, path: str, announce: bool = True):
+        if self.busy():
+            return
+        cancel_binding = self.bind('<Escape>', lambda e: self._task is not None and self._task.cancel())
+
+        def done(task: BackgroundTask):
+            self.unbind('<Escape>', cancel_binding)
+            if isinstance(task.error, LoadCancelled):
+                self.update_status_bar()
+                if not self._quit_pending:
+                    messagebox.showinfo('Učitavanje', 'Učitavanje prekinuto')
+                return
+            try:
+                if task.error is not None:
+                    raise task.error
+                self.library.install(task.result)
+            except Exception as e:
+                self.update_status_bar()
+                messagebox.showerror('Greška', f'Ne mogu učitati datoteku: {e}')
+                return
+            self.title('LibroTrack — Školska knjižnica')
+            self.remember_session(path)
+            self.refresh_tree()
+            self.update_status_bar()
+            if announce:
+                messagebox.showinfo('Učitavanje', 'Uspješno učitano')
+
+        self.run_in_background('Učitavanje',
+                               lambda task: Library.read(path, task.report, task.is_cancelled), done)
+
+    def open_database(self):
+        if self.busy():
+            return
+        path = filedialog.asksaveasfilename(title='Otvori ili stvori bazu', defaultextension=DB_EXT,
+                                            confirmoverwrite=False, filetypes=[('SQLite baze', f'*{DB_EXT}')])
+        if not path:
+            return
         try:
-            tree.write(path, encoding='utf-8', xml_declaration=True)
-            messagebox.showinfo('Spremanje', 'Uspješno spremljeno')
+            self.library.open_database(path)
         except Exception as e:
-            messagebox.showerror('Greška', f'Ne mogu spremiti datoteku: {e}')
+            messagebox.showerror('Greška', f'Ne mogu otvoriti bazu: {e}')
+            return
+        self.show_database()
 
-    def load_xml(self):
-        path = filedialog.askopenfilename(filetypes=[('XML files','*.xml')])
+    def migrate_to_database(self):
+        if self.busy():
+            return
+        src = filedialog.askopenfilename(title='Katalog za prijenos',
+                                         filetypes=[('LibroTrack datoteke', f'*.xml *{SNAPSHOT_EXT}')])
+        if not src:
+            return
+        path = filedialog.asksaveasfilename(title='Nova baza', defaultextension=DB_EXT,
+                                            filetypes=[('SQLite baze', f'*{DB_EXT}')])
         if not path:
             return
+
+        def done(task: BackgroundTask):
+            try:
+                if task.error is not None:
+                    raise task.error
+                self.library.finish_migration(src, path, task.result)
+            except Exception as e:
+                self.update_status_bar()
+                messagebox.showerror('Greška', f'Prijenos nije uspio: {e}')
+                return
+            self.show_database()
+            messagebox.showinfo('Prijenos', 'Katalog je prenesen u bazu')
+
+        self.run_in_background('Prenošenje', lambda task: Library.write_database(src, path, task.report), done)
+
+    # Reading and validating the file runs on a worker thread. The valid rows
+    # change the catalogue, so they are added on the UI thread, IMPORT_CHUNK
+    # at a time between events; other file operations wait until the end.
+    def import_publications(self):
+        if self.busy():
+            return
+        path = filedialog.askopenfilename(title='Uvoz publikacija',
+                                          filetypes=[('CSV, XML i JSON Lines', '*.csv *.xml *.jsonl *.ndjson')])
+        if not path:
+            return
+
+        def done(task: BackgroundTask):
+            if task.error is not None:
+                self.update_status_bar()
+                messagebox.showerror('Greška', f'Uvoz nije uspio: {task.error}')
+                return
+            self._importing = True
+            self._task_label = 'Uvoz'
+            self.add_imported(*task.result, 0)
+
+        self.run_in_background('Uvoz', lambda task: Library.read_import(path, task.report), done,
+                               describe=lambda count: f'Uvoz... pročitano zapisa: {count:.0f}')
+
+    def add_imported(self, rows: list, report, start: int):
         try:
-            tree = ET.parse(path)
-            root = tree.getroot()
-            self.publications.clear()
-            for el in root.findall('publication'):
-                self.publications.append(Publication.from_xml_element(el))
-            self.next_id = int(root.attrib.get('next_id', '1'))
+            self.library.install_import(rows[start:start + IMPORT_CHUNK], report)
+        except Exception as e:
+            self._importing = False
             self.refresh_tree()
             self.update_status_bar()
-            messagebox.showinfo('Učitavanje', 'Uspješno učitano')
-        except Exception as e:
-            messagebox.showerror('Greška', f'Ne mogu učitati datoteku: {e}')
+            messagebox.showerror('Greška', f'Uvoz nije uspio: {e}')
+            return
+        start += IMPORT_CHUNK
+        if start < len(rows) and not self._quit_pending:
+            self.status_var.set(f'Uvoz... dodano {start} od {len(rows)} publikacija')
+            self.after(1, self.add_imported, rows, report, start)
+            return
+        self._importing = False
+        self.refresh_tree()
+        self.update_status_bar()
+        if self._quit_pending:
+            self.quit_app()
+            return
+        self.show_import_report(report)
+
+    def show_import_report(self, report):
+        summary = f'Uvezeno publikacija: {report.added}\nOdbijeno redaka: {len(report.rejected)}'
+        if not report.rejected:
+            messagebox.showinfo('Uvoz', summary)
+            return
+        if not messagebox.askyesno('Uvoz', summary + '\n\nSpremiti popis odbijenih redaka?'):
+            return
+        out = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV', '*.csv')])
+        if out:
+            try:
+                report.write(out)
+            except OSError as e:
+                messagebox.showerror('Greška', f'Ne mogu spremiti izvještaj: {e}')
+
+    # Reports read the whole circulation history, so the columns are built
+    # and aggregated on a worker thread.
+    def run_report(self, label: str):
+        if self.busy():
+            return
+        pubs, total = self.library.circulation_source()
+
+        def work(task: BackgroundTask) -> Report:
+            return REPORTS[label](CirculationColumns.from_publications(pubs, total, task.report))
+
+        def done(task: BackgroundTask):
+            self.update_status_bar()
+            if task.error is not None:
+                messagebox.showerror('Greška', f'Izvještaj nije uspio: {task.error}')
+                return
+            self.show_report(label, task.result)
+
+        self.run_in_background(label, work, done)
+
+    def show_report(self, label: str, report: Report):
+        win = tk.Toplevel(self)
+        win.title(label)
+        win.geometry('720x420')
+        win.configure(bg=self.panel)
+        body = ttk.Frame(win, padding=8)
+        body.pack(fill=tk.BOTH, expand=True)
+        columns = [f'c{i}' for i in range(len(report.headers))]
+        tree = ttk.Treeview(body, columns=columns, show='headings', style='mystyle.Treeview')
+        for column, text in zip(columns, report.headers):
+            tree.heading(column, text=text)
+            tree.column(column, width=120 if len(columns) > 2 else 300)
+        scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for row in report.rows:
+            tree.insert('', tk.END, values=row)
+        if not report.rows:
+            tree.insert('', tk.END, values=('Nema podataka',))
+
+        def export():
+            path = filedialog.asksaveasfilename(parent=win, defaultextension='.csv', filetypes=[('CSV', '*.csv')])
+            if not path:
+                return
+            try:
+                report.write_csv(path)
+            except OSError as e:
+                messagebox.showerror('Greška', f'Ne mogu spremiti izvještaj: {e}', parent=win)
+
+        buttons = ttk.Frame(win, padding=(8,0,8,8))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text='Izvezi CSV...', command=export).pack(side=tk.LEFT)
+        ttk.Button(buttons, text='Zatvori', command=win.destroy).pack(side=tk.RIGHT)
+
+    def show_database(self):
+        self.title(f'LibroTrack — Školska knjižnica ({self.library.db.path})')
+        self.refresh_tree()
+        self.update_status_bar()
 
 if __name__ == '__main__':
+    # XML loads use a process pool; in a frozen build each worker starts
+    # this executable and must stop here. Imported here to keep it out of
+    # the core's import time.
+    import multiprocessing
+    multiprocessing.freeze_support()
     app = LibraryApp()
     app.mainloop()
@@ -0,0 +1,88 @@
+import datetime
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Publication, date_text, day_number
+
+# Loan period in days per publication type; other types get DEFAULT_LOAN_DAYS.
+LOAN_DAYS = {'Knjiga': 21, 'Casopis': 7}
+DEFAULT_LOAN_DAYS = 21
+# The status filter value for loans past their due day.
+OVERDUE = 'Zakašnjelo'
+
+
+def today() -> int:
+    return datetime.date.today().toordinal()
+
+
+def loan_days(typ: str) -> int:
+    return LOAN_DAYS.get(typ, DEFAULT_LOAN_DAYS)
+
+
+# Last day of the loan as a day number, or None for an available publication
+# or a borrow date that is not an ISO date.
+def due_day(pub: Publication) -> Optional[int]:
+    if pub.available:
+        return None
+    day = day_number(pub.borrow_date)
+    if day <= 0:
+        return None
+    return day + loan_days(pub.type)
+
+
+def is_overdue(pub: Publication, day: Optional[int] = None) -> bool:
+    due = due_day(pub)
+    return due is not None and due < (day or today())
+
+
+# Borrow dates before which a loan of each type is overdue on `day`, as ISO
+# text for comparing against stored borrow dates.
+def borrow_cutoffs(day: int) -> Tuple[Dict[str, str], str]:
+    cutoffs = {typ: date_text(day - days) for typ, days in LOAN_DAYS.items()}
+    return cutoffs, date_text(day - DEFAULT_LOAN_DAYS)
+
+
+class DueIndex:
+    # Borrowed publications kept sorted by (due day, id). Borrow and return
+    # move one entry by bisection, so the loans overdue on a given day are a
+    # prefix of the index and those that fell due between two days a slice:
+    # O(log n + k) without parsing a single date.
+
+    def __init__(self, pubs: Iterable[Publication] = ()):
+        self._due: Dict[int, int] = {}
+        for pub in pubs:
+            due = due_day(pub)
+            if due is not None:
+                self._due[pub.id] = due
+        self._order: List[Tuple[int, int]] = sorted((due, pid) for pid, due in self._due.items())
+
+    def __len__(self):
+        return len(self._due)
+
+    def due(self, pub_id: int) -> Optional[int]:
+        return self._due.get(pub_id)
+
+    def add(self, pub: Publication):
+        self.remove(pub.id)
+        due = due_day(pub)
+        if due is not None:
+            self._due[pub.id] = due
+            insort(self._order, (due, pub.id))
+
+    def remove(self, pub_id: int):
+        due = self._due.pop(pub_id, None)
+        if due is not None:
+            del self._order[bisect_left(self._order, (due, pub_id))]
+
+    # Ids whose due day is before `day`, earliest due first.
+    def overdue(self, day: int) -> List[int]:
+        return self.due_between(0, day)
+
+    def count_overdue(self, day: int) -> int:
+        return bisect_left(self._order, (day,))
+
+    # Ids that fell due on or after `start` and before `end`: the loans that
+    # became overdue between those two days.
+    def due_between(self, start: int, end: int) -> List[int]:
+        order = self._order
+        return [pid for _, pid in order[bisect_left(order, (start,)):bisect_left(order, (end,))]]
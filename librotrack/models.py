@@ -0,0 +1,225 @@
+import datetime
+from array import array
+from collections.abc import Sequence
+from enum import IntEnum
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ElementTree is only needed to convert single publications; xml_io does
+# the bulk parsing and writing.
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
+
+
+class Action(IntEnum):
+    POSUDBA = 0
+    VRACANJE = 1
+
+
+class StringPool:
+    # Interns repeated strings (users, unusual actions and dates) as small ints.
+    def __init__(self, initial: Iterable[str] = ()):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for s in initial:
+            self.id(s)
+        self._fixed = len(self.strings)
+
+    # Back to just the initial strings.
+    def reset(self):
+        for s in self.strings[self._fixed:]:
+            del self.ids[s]
+        del self.strings[self._fixed:]
+
+    def id(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+
+USERS = StringPool()
+ACTIONS = StringPool(['posudba', 'vraćanje'])
+ODD_DATES = StringPool()
+
+
+# Starts every pool afresh. Only for a process that parses on its own and
+# ships its pools back, like an XML worker: histories built before the reset
+# would read the wrong strings.
+def reset_pools():
+    for pool in (USERS, ACTIONS, ODD_DATES):
+        pool.reset()
+    day_number.cache_clear()
+    date_text.cache_clear()
+
+
+# History dates are kept as proleptic Gregorian day numbers; 0 is an empty
+# date and negative numbers point into ODD_DATES for text that is not a
+# canonical ISO date, so every value round-trips unchanged.
+@lru_cache(maxsize=1 << 16)
+def day_number(date: str) -> int:
+    if not date:
+        return 0
+    try:
+        d = datetime.date.fromisoformat(date)
+    except ValueError:
+        d = None
+    if d is not None and d.isoformat() == date:
+        return d.toordinal()
+    return -1 - ODD_DATES.id(date)
+
+
+@lru_cache(maxsize=1 << 16)
+def date_text(day: int) -> str:
+    if day > 0:
+        return datetime.date.fromordinal(day).isoformat()
+    if day == 0:
+        return ''
+    return ODD_DATES[-1 - day]
+
+
+class History(Sequence):
+    # Borrowing history as packed rows: interned user id, action code and day
+    # number per entry. It still reads and appends like the old list of
+    # {'user', 'date', 'action'} dicts; dicts and ISO dates are only built
+    # when an entry is read.
+    __slots__ = ('users', 'days', 'actions')
+
+    def __init__(self, entries: Iterable[Dict] = ()):
+        self.users = array('I')
+        self.days = array('i')
+        self.actions = array('H')
+        for e in entries:
+            self.append(e)
+
+    @classmethod
+    def from_columns(cls, users: array, days: array, actions: array) -> 'History':
+        history = cls.__new__(cls)
+        history.users = users
+        history.days = days
+        history.actions = actions
+        return history
+
+    def add(self, user: str, date: str, action: str):
+        self.users.append(USERS.id(user))
+        self.days.append(day_number(date))
+        self.actions.append(ACTIONS.id(action))
+
+    def append(self, entry: Dict):
+        self.add(entry.get('user', ''), entry.get('date', ''), entry.get('action', ''))
+
+    def rows(self) -> Iterator[Tuple[str, str, str]]:
+        users, actions = USERS.strings, ACTIONS.strings
+        for u, d, a in zip(self.users, self.days, self.actions):
+            yield users[u], date_text(d), actions[a]
+
+    # Entry `i` as (user, date, action).
+    def row(self, i: int) -> Tuple[str, str, str]:
+        return USERS[self.users[i]], date_text(self.days[i]), ACTIONS[self.actions[i]]
+
+    # (position, user) of every borrow entry.
+    def borrow_entries(self) -> Iterator[Tuple[int, str]]:
+        users = USERS.strings
+        for i, (u, a) in enumerate(zip(self.users, self.actions)):
+            if a == Action.POSUDBA:
+                yield i, users[u]
+
+    def __len__(self):
+        return len(self.users)
+
+    def __iter__(self):
+        for u, d, a in self.rows():
+            yield {'user': u, 'date': d, 'action': a}
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return {'user': USERS[self.users[i]], 'date': date_text(self.days[i]), 'action': ACTIONS[self.actions[i]]}
+
+    def __eq__(self, other):
+        if isinstance(other, History):
+            return (self.users, self.days, self.actions) == (other.users, other.days, other.actions)
+        if isinstance(other, (list, Sequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'History({list(self)!r})'
+
+
+class Publication:
+    # A plain class rather than a dataclass: dataclasses imports inspect,
+    # which alone would double the core's import time.
+    __slots__ = ('id', 'type', 'title', 'author_or_publisher', 'year', 'available', 'borrowed_to', 'borrow_date',
+                 'history')
+
+    def __init__(self, id: int, type: str, title: str, author_or_publisher: str, year: str, available: bool = True,
+                 borrowed_to: str = '', borrow_date: str = '', history: Optional[History] = None):
+        self.id = id
+        self.type = type
+        self.title = title
+        self.author_or_publisher = author_or_publisher
+        self.year = year
+        self.available = available
+        self.borrowed_to = borrowed_to
+        self.borrow_date = borrow_date
+        if history is None:
+            history = History()
+        elif isinstance(history, list):
+            history = History(history)
+        self.history = history
+
+    def _fields(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in zip(self.__slots__, self._fields()))
+        return f'Publication({fields})'
+
+    def status_text(self) -> str:
+        return 'Dostupno' if self.available else f'Posuđeno ({self.borrowed_to})'
+
+    def to_xml_element(self) -> 'ET.Element':
+        import xml.etree.ElementTree as ET
+        el = ET.Element('publication', attrib={'id': str(self.id), 'type': self.type})
+        ET.SubElement(el, 'title').text = self.title
+        ET.SubElement(el, 'author_or_publisher').text = self.author_or_publisher
+        ET.SubElement(el, 'year').text = self.year
+        ET.SubElement(el, 'available').text = '1' if self.available else '0'
+        ET.SubElement(el, 'borrowed_to').text = self.borrowed_to
+        ET.SubElement(el, 'borrow_date').text = self.borrow_date
+        hist_el = ET.SubElement(el, 'history')
+        for user, date, action in self.history.rows():
+            entry = ET.SubElement(hist_el, 'entry')
+            ET.SubElement(entry, 'user').text = user
+            ET.SubElement(entry, 'date').text = date
+            ET.SubElement(entry, 'action').text = action
+        return el
+
+    @staticmethod
+    def from_xml_element(el: 'ET.Element'):
+        id = int(el.attrib.get('id','0'))
+        type = el.attrib.get('type','Knjiga')
+        title = el.findtext('title','')
+        aop = el.findtext('author_or_publisher','')
+        year = el.findtext('year','')
+        available = el.findtext('available','1') == '1'
+        borrowed_to = el.findtext('borrowed_to','')
+        borrow_date = el.findtext('borrow_date','')
+        history = History()
+        hist_el = el.find('history')
+        if hist_el is not None:
+            for entry in hist_el.findall('entry'):
+                history.add(entry.findtext('user',''), entry.findtext('date',''), entry.findtext('action',''))
+        return Publication(id, type, title, aop, year, available, borrowed_to, borrow_date, history)
@@ -0,0 +1,79 @@
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple
+
+from models import Publication
+from sort_index import collation_key
+
+
+# Key under which a user's loans are filed: case, accents' composition and
+# spacing as typed at the desk do not split one patron into several.
+def normalise_user(name: str) -> str:
+    return ' '.join(unicodedata.normalize('NFC', name).split()).casefold()
+
+
+class PatronIndex:
+    # Normalised user name -> ids of the publications they hold now, plus
+    # pointers (publication id, history position) to every borrow entry of
+    # theirs. Borrow and return update one patron; a lookup costs as much as
+    # its result. Pointers are never moved because histories only grow; those
+    # into deleted publications are skipped when read.
+
+    def __init__(self, pubs: Iterable[Publication] = ()):
+        self.names: Dict[str, str] = {}
+        self.held: Dict[str, Set[int]] = {}
+        self.loans: Dict[str, Tuple[array, array]] = {}
+        keys: Dict[str, str] = {}
+        for pub in pubs:
+            for position, user in pub.history.borrow_entries():
+                key = keys.get(user)
+                if key is None:
+                    key = keys[user] = self._patron(user)
+                ids, positions = self.loans[key]
+                ids.append(pub.id)
+                positions.append(position)
+            if not pub.available and pub.borrowed_to:
+                self.held[self._patron(pub.borrowed_to)].add(pub.id)
+
+    def __len__(self):
+        return len(self.names)
+
+    # The key for `user`, registering the patron on first sight. The display
+    # name is the spelling most recently seen.
+    def _patron(self, user: str) -> str:
+        key = normalise_user(user)
+        self.names[key] = user
+        if key not in self.loans:
+            self.loans[key] = (array('I'), array('I'))
+            self.held[key] = set()
+        return key
+
+    # `position` is where the borrow entry went in the publication's history.
+    def borrowed(self, pub: Publication, position: int):
+        key = self._patron(pub.borrowed_to)
+        self.held[key].add(pub.id)
+        ids, positions = self.loans[key]
+        ids.append(pub.id)
+        positions.append(position)
+
+    def returned(self, pub_id: int, user: str):
+        self.held.get(normalise_user(user), set()).discard(pub_id)
+
+    def removed(self, pub: Publication):
+        if not pub.available:
+            self.returned(pub.id, pub.borrowed_to)
+
+    # Display names of the patrons whose name contains `text`, in Croatian
+    # alphabet order.
+    def find(self, text: str) -> List[str]:
+        text = normalise_user(text)
+        return sorted((name for key, name in self.names.items() if text in key), key=collation_key)
+
+    def holding(self, user: str) -> List[int]:
+        return sorted(self.held.get(normalise_user(user), ()))
+
+    # (publication id, history position) of each of the user's borrows, in
+    # the order they were indexed.
+    def borrows(self, user: str) -> List[Tuple[int, int]]:
+        ids, positions = self.loans.get(normalise_user(user), ((), ()))
+        return list(zip(ids, positions))
@@ -0,0 +1,227 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+from atomic import atomic_write
+
+# cProfile and pstats are imported when a capture is asked for.
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+# Set LIBROTRACK_PERF=1 to start with timing on; it can also be switched on
+# and off from Pomoć -> Performanse.
+ENABLED_AT_START = bool(os.environ.get('LIBROTRACK_PERF'))
+# Upper bounds of the histogram buckets; one more bucket takes the rest.
+TIME_BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+SIZE_BOUNDS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+PROFILE_LINES = 40
+
+
+class Histogram:
+    # Counts of values per bucket plus their count, sum and maximum. Quantiles
+    # are read off the buckets, so they are upper bounds, not exact values.
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def quantile(self, q: float):
+        seen = 0
+        for bound, n in zip(self.bounds, self.buckets):
+            seen += n
+            if seen >= q * self.count:
+                return min(bound, self.max)
+        return self.max
+
+    # One text line per bucket with a bar scaled to the fullest bucket;
+    # values are multiplied by `scale` for display.
+    def lines(self, scale: float = 1, unit: str = '', width: int = 40) -> List[str]:
+        top = max(self.buckets) or 1
+        out = []
+        for i, n in enumerate(self.buckets):
+            bound = self.bounds[min(i, len(self.bounds) - 1)] * scale
+            bound = f'{bound:,.0f}' if bound >= 1 else f'{bound:g}'
+            label = f'{"≤" if i < len(self.bounds) else ">"} {bound} {unit}'.rstrip()
+            out.append(f'{label:>14}  {"█" * round(n / top * width):<{width}}  {n}')
+        return out
+
+    def as_dict(self) -> Dict:
+        return {
+            'count': self.count, 'total': self.total, 'max': self.max,
+            'p50': self.quantile(0.5), 'p95': self.quantile(0.95),
+            'buckets': [[bound, n] for bound, n in zip(list(self.bounds) + [None], self.buckets)],
+        }
+
+
+class Recorder:
+    # Timing histograms per operation and size histograms per refresh, and
+    # the cProfile captures of the next N operations when asked for. Worker
+    # threads record here too; only the outermost timed call on a thread
+    # counts as an operation for profiling, and only while no other thread's
+    # is being profiled (Python 3.12 allows one active profiler).
+
+    def __init__(self):
+        self.timings: Dict[str, Histogram] = {}
+        self.sizes: Dict[str, Histogram] = {}
+        self.profile_left = 0
+        self.profiles: List[Tuple[str, 'cProfile.Profile']] = []
+        self._profiling = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.timings.get(name)
+            if histogram is None:
+                histogram = self.timings[name] = Histogram(TIME_BOUNDS)
+            histogram.add(seconds)
+
+    def record_size(self, name: str, n: int):
+        with self._lock:
+            histogram = self.sizes.get(name)
+            if histogram is None:
+                histogram = self.sizes[name] = Histogram(SIZE_BOUNDS)
+            histogram.add(n)
+
+    def call(self, name: str, fn: Callable, args, kwargs):
+        depth = getattr(self._local, 'depth', 0)
+        profile = None
+        if depth == 0 and self.profile_left > 0 and not self._profiling:
+            with self._lock:
+                if self.profile_left > 0 and not self._profiling:
+                    self.profile_left -= 1
+                    self._profiling = True
+                    import cProfile
+                    profile = cProfile.Profile()
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                return profile.runcall(fn, *args, **kwargs)
+            return fn(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - start)
+            self._local.depth = depth
+            if profile is not None:
+                with self._lock:
+                    self.profiles.append((name, profile))
+                    self._profiling = False
+
+    # Starts a new capture: the next `n` operations are profiled.
+    def profile_next(self, n: int):
+        with self._lock:
+            self.profiles = []
+            self.profile_left = n
+
+    def profile_stats(self, stream=None) -> Optional['pstats.Stats']:
+        import pstats
+        with self._lock:
+            profiles = [profile for _, profile in self.profiles]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    # The capture so far as pstats text, slowest cumulative first.
+    def profile_text(self) -> str:
+        import io
+        out = io.StringIO()
+        stats = self.profile_stats(out)
+        if stats is None:
+            return ''
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+        return out.getvalue()
+
+    # Writes the capture in pstats' binary format, for snakeviz and friends.
+    def dump_profile(self, path: str) -> bool:
+        stats = self.profile_stats()
+        if stats is None:
+            return False
+        stats.dump_stats(path)
+        return True
+
+    # Copies of the timing and size histograms by name, safe to iterate while
+    # other threads record.
+    def histograms(self) -> Tuple[Dict[str, Histogram], Dict[str, Histogram]]:
+        with self._lock:
+            return dict(self.timings), dict(self.sizes)
+
+    def clear(self):
+        with self._lock:
+            self.timings.clear()
+            self.sizes.clear()
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'timings': {name: h.as_dict() for name, h in sorted(self.timings.items())},
+                'sizes': {name: h.as_dict() for name, h in sorted(self.sizes.items())},
+            }
+
+    def dump(self, path: str):
+        with atomic_write(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+# The recorder while timing is on; None while it is off. What was recorded
+# stays in _recorded across switching off and on again.
+recorder: Optional[Recorder] = None
+_recorded: Optional[Recorder] = None
+
+
+def enable() -> Recorder:
+    global recorder, _recorded
+    if _recorded is None:
+        _recorded = Recorder()
+    recorder = _recorded
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
+
+
+def recorded() -> Optional[Recorder]:
+    return _recorded
+
+
+# Times every call of the decorated function under its qualified name while
+# a recorder is on. Off, a call costs one extra frame and a global lookup.
+def timed(fn: Callable) -> Callable:
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def timed_call(*args, **kwargs):
+        rec = recorder
+        if rec is None:
+            return fn(*args, **kwargs)
+        return rec.call(name, fn, args, kwargs)
+    return timed_call
+
+
+if ENABLED_AT_START:
+    enable()
@@ -0,0 +1,155 @@
+import unicodedata
+from array import array
+from itertools import compress
+from typing import Dict, Iterable, List, Optional
+
+GRAM = 3
+
+
+class _FoldTable(dict):
+    # str.translate mapping: one folded character per input character, so that
+    # a substring of the lowered text stays a substring after folding.
+    def __missing__(self, code):
+        ch = chr(code)
+        base = unicodedata.normalize('NFD', ch)[0]
+        if ch == 'đ':
+            base = 'd'
+        self[code] = base
+        return base
+
+
+_FOLD = _FoldTable()
+
+
+def fold(text: str) -> str:
+    return text.translate(_FOLD)
+
+
+def grams(text: str) -> Iterable[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+# Row masks hold one byte (0 or 1) per index position. Two masks are ANDed by
+# reading them as big integers, which keeps the whole operation in C, and the
+# result is turned back into ids with itertools.compress.
+def _and(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, 'little') & int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+class SearchIndex:
+    # Besides the trigram postings, every position carries its type and
+    # availability as row masks (`_live`, `_available`, one per type), kept
+    # up to date by add, remove and set_available, so filter() answers the
+    # type/status part of a query without looking at the publications.
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._ids: List[Optional[int]] = []
+        self._titles: List[Optional[str]] = []
+        self._aops: List[Optional[str]] = []
+        self._seq: Dict[int, int] = {}
+        self._types: List[Optional[str]] = []
+        self._postings: Dict[str, array] = {}
+        self._live = bytearray()
+        self._available = bytearray()
+        self._type_masks: Dict[str, bytearray] = {}
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._seq)
+
+    # Monotonic in insertion order; used to keep sorted id lists in catalogue order.
+    def position(self, pub_id: int) -> int:
+        return self._seq[pub_id]
+
+    def add(self, pub):
+        if pub.id in self._seq:
+            self.remove(pub.id)
+        self._insert(pub.id, pub.title.lower(), pub.author_or_publisher.lower(), pub.type, pub.available)
+
+    def _insert(self, pub_id: int, title: str, aop: str, typ: str, available: bool):
+        seq = len(self._ids)
+        self._ids.append(pub_id)
+        self._titles.append(title)
+        self._aops.append(aop)
+        self._types.append(typ)
+        self._seq[pub_id] = seq
+        self._live.append(1)
+        self._available.append(1 if available else 0)
+        mask = self._type_masks.get(typ)
+        if mask is None:
+            mask = self._type_masks[typ] = bytearray(seq)
+        for t, m in self._type_masks.items():
+            m.append(1 if t == typ else 0)
+        postings = self._postings
+        for g in grams(fold(title)) | grams(fold(aop)):
+            p = postings.get(g)
+            if p is None:
+                postings[g] = array('I', (seq,))
+            else:
+                p.append(seq)
+
+    def remove(self, pub_id: int):
+        seq = self._seq.pop(pub_id, None)
+        if seq is None:
+            return
+        self._ids[seq] = None
+        self._titles[seq] = None
+        self._aops[seq] = None
+        self._live[seq] = 0
+        self._available[seq] = 0
+        self._type_masks[self._types[seq]][seq] = 0
+        self._types[seq] = None
+        self._stale += 1
+        if self._stale > 1024 and self._stale > len(self._seq):
+            self._compact()
+
+    def set_available(self, pub_id: int, available: bool):
+        self._available[self._seq[pub_id]] = 1 if available else 0
+
+    # q must already be lowered. Trigram postings only narrow the candidates,
+    # the match itself stays the exact `q in text.lower()` test.
+    def search(self, q: str) -> List[int]:
+        return self.filter('Sve', 'Sve', q)
+
+    # Ids passing the table filter (type, status as in the filter comboboxes,
+    # lowered query), in insertion order.
+    def filter(self, typ: str, stat: str, q: str) -> List[int]:
+        mask = self._live
+        if typ != 'Sve':
+            mask = self._type_masks.get(typ)
+            if mask is None:
+                return []
+        if stat == 'Dostupno':
+            mask = _and(mask, self._available)
+        elif stat == 'Posuđeno':
+            mask = _and(mask, _xor(self._live, self._available))
+        if not q:
+            return list(compress(self._ids, mask))
+        titles, aops = self._titles, self._aops
+        fq = fold(q)
+        if len(fq) < GRAM:
+            candidates = compress(range(len(mask)), mask)
+        else:
+            lists = []
+            for g in grams(fq):
+                p = self._postings.get(g)
+                if p is None:
+                    return []
+                lists.append(p)
+            candidates = min(lists, key=len)
+        ids = self._ids
+        return [ids[s] for s in candidates if mask[s] and (q in titles[s] or q in aops[s])]
+
+    def _compact(self):
+        live = [(pid, t, a, typ, avail) for pid, t, a, typ, avail in
+                zip(self._ids, self._titles, self._aops, self._types, self._available) if pid is not None]
+        self.clear()
+        for row in live:
+            self._insert(*row)
@@ -0,0 +1,260 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import weakref
+from array import array
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic import atomic_write
+from models import ACTIONS, USERS, History, Publication, day_number
+
+# Binary snapshot layout (little-endian):
+#   header   MAGIC, version u16, reserved u16, next_id u64, publication count u64
+#   sections each prefixed with its byte length (u64), in this order:
+#            string table (UTF-8, NUL separated), then one column per field:
+#            id q, type/title/author/year I, available B, borrowed_to/borrow_date I,
+#            history count I, history user/date/action I
+# Every text value is stored once in the string table and referenced by index,
+# which folds the heavily repeated type, author, user, date and action values.
+MAGIC = b'LTRKSNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sHHQQ')
+SECTION = struct.Struct('<Q')
+SNAPSHOT_EXT = '.ltrk'
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def is_snapshot(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def ref(self, s: str) -> int:
+        i = self.index.get(s)
+        if i is None:
+            if '\0' in s:
+                raise SnapshotError('Tekst ne smije sadržavati znak NUL')
+            i = self.index[s] = len(self.index)
+        return i
+
+    def encode(self) -> bytes:
+        return '\0'.join(self.index).encode('utf-8')
+
+
+def _column(code: str, values: Iterable) -> bytes:
+    col = array(code, values)
+    if sys.byteorder == 'big':
+        col.byteswap()
+    return col.tobytes()
+
+
+def _read_column(code: str, data) -> array:
+    col = array(code)
+    col.frombytes(data)
+    if sys.byteorder == 'big':
+        col.byteswap()
+    return col
+
+
+def write_snapshot(path: str, pubs: Iterable[Publication], next_id: int,
+                   progress: Optional[Callable[[float], None]] = None):
+    pubs = list(pubs)
+    strings = _StringTable()
+    ref = strings.ref
+    hist_users, hist_dates, hist_actions = array('I'), array('I'), array('I')
+    for p in pubs:
+        for user, date, action in p.history.rows():
+            hist_users.append(ref(user))
+            hist_dates.append(ref(date))
+            hist_actions.append(ref(action))
+    if progress is not None:
+        progress(0.5)
+    columns = [
+        _column('q', (p.id for p in pubs)),
+        _column('I', (ref(p.type) for p in pubs)),
+        _column('I', (ref(p.title) for p in pubs)),
+        _column('I', (ref(p.author_or_publisher) for p in pubs)),
+        _column('I', (ref(p.year) for p in pubs)),
+        bytes(p.available for p in pubs),
+        _column('I', (ref(p.borrowed_to) for p in pubs)),
+        _column('I', (ref(p.borrow_date) for p in pubs)),
+        _column('I', (len(p.history) for p in pubs)),
+        _column('I', hist_users),
+        _column('I', hist_dates),
+        _column('I', hist_actions),
+    ]
+    with atomic_write(path) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, next_id, len(pubs)))
+        for section in [strings.encode()] + columns:
+            f.write(SECTION.pack(len(section)))
+            f.write(section)
+    if progress is not None:
+        progress(1.0)
+
+
+# With lazy_history the file is memory-mapped and only the publication
+# columns are decoded; each history stays a MappedHistory over the mapped
+# columns until something reads it, so opening costs time and memory in
+# proportion to the number of publications, not of history entries. Call
+# release_snapshot before replacing the file: Windows will not replace a
+# file that is mapped.
+def read_snapshot(path: str, progress: Optional[Callable[[float], None]] = None,
+                  lazy_history: bool = False) -> Tuple[List[Publication], int]:
+    with open(path, 'rb') as f:
+        if lazy_history:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    magic, version, _, next_id, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError('Datoteka nije LibroTrack snimka')
+    if version != VERSION:
+        raise SnapshotError(f'Nepodržana verzija snimke: {version}')
+    view = memoryview(data)
+    sections = []
+    pos = HEADER.size
+    for _ in range(13):
+        size, = SECTION.unpack_from(data, pos)
+        pos += SECTION.size
+        sections.append(view[pos:pos + size])
+        pos += size
+    strings = str(sections[0], 'utf-8').split('\0')
+
+    def text(section):
+        return map(strings.__getitem__, _read_column('I', section))
+
+    ids = _read_column('q', sections[1])
+    if len(ids) != count:
+        raise SnapshotError('Oštećena snimka')
+    if progress is not None:
+        progress(0.5)
+    counts = _read_column('I', sections[9])
+    if lazy_history:
+        mapped = _MappedColumns(path, tuple(_mapped_column(s) for s in sections[10:13]))
+        histories = (MappedHistory(strings, mapped, start - n, n)
+                     for start, n in zip(accumulate(counts), counts))
+    else:
+        users, days, actions = (_translate(strings, _read_column('I', s), fn, code) for s, fn, code in
+                                zip(sections[10:13], (USERS.id, day_number, ACTIONS.id), 'IiH'))
+        histories = (History.from_columns(users[start - n:start], days[start - n:start], actions[start - n:start])
+                     for start, n in zip(accumulate(counts), counts))
+    pubs = []
+    for pid, typ, title, aop, year, avail, bt, bd, history in zip(
+            ids, text(sections[2]), text(sections[3]), text(sections[4]), text(sections[5]),
+            map(bool, sections[6]), text(sections[7]), text(sections[8]), histories):
+        pubs.append(Publication(pid, typ, title, aop, year, avail, bt, bd, history))
+    if progress is not None:
+        progress(1.0)
+    return pubs, next_id
+
+
+class _MappedColumns:
+    # The history columns of one lazily read snapshot, shared by its
+    # MappedHistory objects. release() swaps them for copies in memory;
+    # once nothing refers to the mapped ones the mapping is closed.
+    __slots__ = ('path', 'columns', '__weakref__')
+
+    def __init__(self, path: str, columns: Tuple):
+        self.path = _path_key(path)
+        self.columns = columns
+        _mapped.add(self)
+
+    def release(self):
+        with MappedHistory._lock:
+            copies = []
+            for column in self.columns:
+                if isinstance(column, memoryview):
+                    copy = array('I')
+                    copy.frombytes(column.cast('B'))
+                    column = copy
+                copies.append(column)
+            self.columns = tuple(copies)
+        _mapped.discard(self)
+
+
+_mapped: 'weakref.WeakSet[_MappedColumns]' = weakref.WeakSet()
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+# Lets go of every mapping of the snapshot at `path`; histories not decoded
+# yet keep their rows in memory instead.
+def release_snapshot(path: str):
+    key = _path_key(path)
+    for mapped in [m for m in _mapped if m.path == key]:
+        mapped.release()
+
+
+def _mapped_column(section: memoryview):
+    if sys.byteorder == 'little':
+        return section.cast('I')
+    return _read_column('I', section)
+
+
+# Converts a column of string-table refs into pool ids, once per distinct string.
+def _translate(strings: List[str], refs, fn, code: str) -> array:
+    ids = {i: fn(strings[i]) for i in set(refs)}
+    return array(code, map(ids.__getitem__, refs))
+
+
+def _fill_history(history: History, strings: List[str], mapped: _MappedColumns, start: int, count: int):
+    users, dates, actions = (c[start:start + count] for c in mapped.columns)
+    history.users = _translate(strings, users, USERS.id, 'I')
+    history.days = _translate(strings, dates, day_number, 'i')
+    history.actions = _translate(strings, actions, ACTIONS.id, 'H')
+
+
+class MappedHistory(History):
+    # A History whose packed rows are still in the mapped snapshot. len() is
+    # answered from the stored count; the first access to the rows decodes
+    # them and drops the reference to the mapping. A background save may be
+    # the first reader, hence the lock.
+    __slots__ = ('_source',)
+    _lock = threading.Lock()
+
+    def __init__(self, strings: List[str], mapped: _MappedColumns, start: int, count: int):
+        self._source = (strings, mapped, start, count)
+
+    def __getattr__(self, name):
+        if name in ('users', 'days', 'actions'):
+            with self._lock:
+                if self._source is not None:
+                    _fill_history(self, *self._source)
+                    self._source = None
+            return object.__getattribute__(self, name)
+        raise AttributeError(name)
+
+    def __len__(self):
+        if self._source is not None:
+            return self._source[3]
+        return len(self.users)
+
+    # Single entries and borrow entries are read straight off the mapping, so
+    # paging through a history or indexing its users does not decode it.
+    def row(self, i: int) -> Tuple[str, str, str]:
+        source = self._source
+        if source is None:
+            return super().row(i)
+        strings, mapped, start, _ = source
+        return tuple(strings[column[start + i]] for column in mapped.columns)
+
+    def borrow_entries(self) -> Iterator[Tuple[int, str]]:
+        source = self._source
+        if source is None:
+            return super().borrow_entries()
+        strings, mapped, start, count = source
+        users, _, actions = mapped.columns
+        return ((i, strings[u]) for i, (u, a) in enumerate(zip(users[start:start + count], actions[start:start + count]))
+                if strings[a] == 'posudba')
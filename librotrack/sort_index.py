@@ -0,0 +1,121 @@
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Callable, Dict, Iterable, List
+
+# Croatian alphabet order, with the Latin letters it lacks slotted where
+# they fall in the Latin alphabet. The digraphs dž, lj and nj are letters.
+ALPHABET = ['a', 'b', 'c', 'č', 'ć', 'd', 'dž', 'đ', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'lj', 'm',
+            'n', 'nj', 'o', 'p', 'q', 'r', 's', 'š', 't', 'u', 'v', 'w', 'x', 'y', 'z', 'ž']
+_LETTER_BASE = 0xE000
+_DIGRAPHS = ('dž', 'lj', 'nj')
+
+
+class _CollationTable(dict):
+    # str.translate mapping onto private-use characters in alphabet order, so
+    # that plain string comparison follows Croatian collation. Digits and
+    # punctuation keep their code points and therefore sort before letters.
+    def __missing__(self, code):
+        ch = chr(code)
+        if ch not in _RANKS:
+            base = unicodedata.normalize('NFD', ch)[0]
+            if base in _RANKS and base != ch:
+                ch = base
+        rank = _RANKS.get(ch)
+        self[code] = ch if rank is None else chr(_LETTER_BASE + rank)
+        return self[code]
+
+
+_RANKS = {letter: rank for rank, letter in enumerate(ALPHABET)}
+_COLLATION = _CollationTable()
+
+
+# Primary key in Croatian alphabet order, ignoring case; the text itself
+# breaks ties so the order is total.
+def collation_key(text: str) -> tuple:
+    primary = text.lower()
+    for digraph in _DIGRAPHS:
+        if digraph in primary:
+            primary = primary.replace(digraph, chr(_LETTER_BASE + _RANKS[digraph]))
+    return primary.translate(_COLLATION), text
+
+
+def year_key(year: str) -> tuple:
+    if year.isdigit():
+        return 0, int(year), ''
+    return 1, 0, year
+
+
+COLUMN_KEYS: Dict[str, Callable] = {
+    'title': lambda p: collation_key(p.title),
+    'author': lambda p: collation_key(p.author_or_publisher),
+    'year': lambda p: year_key(p.year),
+    'status': lambda p: (not p.available, collation_key(p.borrowed_to)),
+}
+
+
+class Descending:
+    # Reverses the comparison of a sort key, so a descending view can still be
+    # searched with bisect.
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+class SortIndex:
+    # One table column kept sorted over the whole catalogue. Each publication's
+    # key is computed once and stored; adds, deletes and key changes move a
+    # single entry by bisection, so switching to this column never sorts.
+
+    def __init__(self, column: str, pubs: Iterable):
+        self.key_of = COLUMN_KEYS[column]
+        self._keys: Dict[int, tuple] = {p.id: (self.key_of(p), p.id) for p in pubs}
+        self._order: List[tuple] = sorted(self._keys.values())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def key(self, pub_id: int) -> tuple:
+        return self._keys[pub_id]
+
+    def add(self, pub):
+        key = self._keys[pub.id] = (self.key_of(pub), pub.id)
+        insort(self._order, key)
+
+    # A batch is sorted on its own and merged in, one pass over the index.
+    def add_many(self, pubs: Iterable):
+        keys = []
+        for pub in pubs:
+            key = self._keys[pub.id] = (self.key_of(pub), pub.id)
+            keys.append(key)
+        keys.sort()
+        self._order = list(merge(self._order, keys))
+
+    def remove(self, pub_id: int):
+        key = self._keys.pop(pub_id, None)
+        if key is not None:
+            del self._order[bisect_left(self._order, key)]
+
+    # Returns False when the publication's key did not change.
+    def update(self, pub) -> bool:
+        old = self._keys.get(pub.id)
+        if old is not None and old[0] == self.key_of(pub):
+            return False
+        self.remove(pub.id)
+        self.add(pub)
+        return True
+
+    # `ids` (any subset of the indexed ids) in this column's order. A large
+    # subset is read off the index; a small one is cheaper to sort by the
+    # stored keys.
+    def ordered(self, ids: List[int]) -> List[int]:
+        if len(ids) == len(self._keys):
+            return [pid for _, pid in self._order]
+        if len(ids) * 16 < len(self._keys):
+            return sorted(ids, key=self._keys.__getitem__)
+        keep = set(ids)
+        return [pid for _, pid in self._order if pid in keep]
@@ -0,0 +1,355 @@
+import sqlite3
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from history_index import HISTORY_PAGE, HistoryFilter
+from journal import replay_journal
+from loans import OVERDUE, borrow_cutoffs, today
+from models import History, Publication
+from patrons import normalise_user
+from snapshot import is_snapshot, read_snapshot
+from xml_io import read_catalogue_parallel
+
+DB_EXT = '.db'
+IMPORT_BATCH = 5000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS publication (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author_or_publisher TEXT NOT NULL DEFAULT '',
+    year TEXT NOT NULL DEFAULT '',
+    available INTEGER NOT NULL DEFAULT 1,
+    borrowed_to TEXT NOT NULL DEFAULT '',
+    borrow_date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS publication_type ON publication(type, available);
+CREATE INDEX IF NOT EXISTS publication_available ON publication(available);
+CREATE INDEX IF NOT EXISTS publication_borrowed ON publication(borrow_date) WHERE available = 0;
+CREATE TABLE IF NOT EXISTS counters (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total INTEGER NOT NULL,
+    available INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS loan_days (
+    type TEXT NOT NULL,
+    borrow_date TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (type, borrow_date)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS publication_count_ai AFTER INSERT ON publication BEGIN
+    UPDATE counters SET total = total + 1, available = available + new.available;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_count_ad AFTER DELETE ON publication BEGIN
+    UPDATE counters SET total = total - 1, available = available - old.available;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_count_au AFTER UPDATE OF available ON publication
+WHEN new.available != old.available BEGIN
+    UPDATE counters SET available = available + new.available - old.available;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_loan_ai AFTER INSERT ON publication WHEN new.available = 0 BEGIN
+    INSERT INTO loan_days(type, borrow_date, n) VALUES (new.type, new.borrow_date, 1)
+    ON CONFLICT (type, borrow_date) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_loan_ad AFTER DELETE ON publication WHEN old.available = 0 BEGIN
+    UPDATE loan_days SET n = n - 1 WHERE type = old.type AND borrow_date = old.borrow_date;
+    DELETE FROM loan_days WHERE type = old.type AND borrow_date = old.borrow_date AND n = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_loan_au_old AFTER UPDATE OF available, type, borrow_date ON publication
+WHEN old.available = 0 BEGIN
+    UPDATE loan_days SET n = n - 1 WHERE type = old.type AND borrow_date = old.borrow_date;
+    DELETE FROM loan_days WHERE type = old.type AND borrow_date = old.borrow_date AND n = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS publication_loan_au_new AFTER UPDATE OF available, type, borrow_date ON publication
+WHEN new.available = 0 BEGIN
+    INSERT INTO loan_days(type, borrow_date, n) VALUES (new.type, new.borrow_date, 1)
+    ON CONFLICT (type, borrow_date) DO UPDATE SET n = n + 1;
+END;
+CREATE TABLE IF NOT EXISTS history (
+    pub_id INTEGER NOT NULL REFERENCES publication(id) ON DELETE CASCADE,
+    user TEXT NOT NULL,
+    date TEXT NOT NULL,
+    action TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_pub ON history(pub_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS publication_fts USING fts5(
+    title, author_or_publisher, content='publication', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS publication_ai AFTER INSERT ON publication BEGIN
+    INSERT INTO publication_fts(rowid, title, author_or_publisher)
+    VALUES (new.id, new.title, new.author_or_publisher);
+END;
+CREATE TRIGGER IF NOT EXISTS publication_ad AFTER DELETE ON publication BEGIN
+    INSERT INTO publication_fts(publication_fts, rowid, title, author_or_publisher)
+    VALUES ('delete', old.id, old.title, old.author_or_publisher);
+END;
+'''
+
+COLUMNS = 'id, type, title, author_or_publisher, year, available, borrowed_to, borrow_date'
+ISO_DATE = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+
+
+# SQL condition, with its parameters, for a loan of `type` on `borrow_date`
+# being overdue on `day`: the ISO borrow date is before its type's cutoff.
+def overdue_terms(day: int) -> Tuple[str, list]:
+    cutoffs, default = borrow_cutoffs(day)
+    whens = ' '.join('WHEN ? THEN ?' for _ in cutoffs)
+    params = [value for item in cutoffs.items() for value in item] + [default]
+    return f"borrow_date GLOB '{ISO_DATE}' AND borrow_date < CASE type {whens} ELSE ? END", params
+
+
+# The same for a publication: borrowed, and overdue as above.
+def overdue_condition(day: int) -> Tuple[str, list]:
+    terms, params = overdue_terms(day)
+    return 'available = 0 AND ' + terms, params
+
+
+class SqliteLibrary:
+    # Catalogue kept in an SQLite file instead of memory. Every mutation is its
+    # own small transaction in WAL mode with synchronous=FULL, so a borrow is
+    # on disk when the call returns and opening the file does not read the
+    # catalogue. Text search uses an FTS5 trigram table for candidates and then
+    # applies the app's exact `q in text.lower()` test. Triggers keep the
+    # totals in counters and the loans per type and borrow date in loan_days,
+    # in the same transaction as the change, so the status bar reads a few
+    # rows instead of the catalogue.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.create_function('normalise_user', 1, normalise_user, deterministic=True)
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('next_id', '1')")
+        # A database from before the counter tables is counted once.
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            if self.conn.execute('SELECT 1 FROM counters').fetchone() is None:
+                self.conn.execute('INSERT INTO counters(id, total, available) '
+                                  'SELECT 1, COUNT(*), COALESCE(SUM(available), 0) FROM publication')
+                self.conn.execute('DELETE FROM loan_days')
+                self.conn.execute('INSERT INTO loan_days(type, borrow_date, n) SELECT type, borrow_date, COUNT(*) '
+                                  'FROM publication WHERE available = 0 GROUP BY type, borrow_date')
+
+    def close(self):
+        self.conn.close()
+
+    @property
+    def next_id(self) -> int:
+        return int(self.conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()[0])
+
+    def _set_next_id(self, next_id: int):
+        self.conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (str(next_id),))
+
+    def add(self, type: str, title: str, author_or_publisher: str, year: str) -> Publication:
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            pub = Publication(self.next_id, type, title, author_or_publisher, year)
+            self.conn.execute('INSERT INTO publication(id, type, title, author_or_publisher, year) '
+                              'VALUES (?, ?, ?, ?, ?)', (pub.id, type, title, author_or_publisher, year))
+            self._set_next_id(pub.id + 1)
+        return pub
+
+    def get(self, pub_id: int, with_history: bool = False) -> Optional[Publication]:
+        row = self.conn.execute(f'SELECT {COLUMNS} FROM publication WHERE id = ?', (pub_id,)).fetchone()
+        if row is None:
+            return None
+        pub = Publication(*row[:5], bool(row[5]), row[6], row[7])
+        if with_history:
+            pub.history = History(self.history(pub_id))
+        return pub
+
+    def borrow(self, pub_id: int, user: str, date: str) -> bool:
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            cur = self.conn.execute('UPDATE publication SET available = 0, borrowed_to = ?, borrow_date = ? '
+                                    'WHERE id = ? AND available = 1', (user, date, pub_id))
+            if not cur.rowcount:
+                return False
+            self.conn.execute('INSERT INTO history(pub_id, user, date, action) VALUES (?, ?, ?, ?)',
+                              (pub_id, user, date, 'posudba'))
+        return True
+
+    def return_publication(self, pub_id: int, date: str) -> bool:
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute('SELECT borrowed_to FROM publication WHERE id = ? AND available = 0',
+                                    (pub_id,)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute("UPDATE publication SET available = 1, borrowed_to = '', borrow_date = '' "
+                              'WHERE id = ?', (pub_id,))
+            self.conn.execute('INSERT INTO history(pub_id, user, date, action) VALUES (?, ?, ?, ?)',
+                              (pub_id, row[0], date, 'vraćanje'))
+        return True
+
+    def delete(self, pub_id: int):
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.execute('DELETE FROM publication WHERE id = ?', (pub_id,))
+
+    def history(self, pub_id: int) -> List[Dict]:
+        rows = self.conn.execute('SELECT user, date, action FROM history WHERE pub_id = ? ORDER BY rowid',
+                                 (pub_id,))
+        return [{'user': u, 'date': d, 'action': a} for u, d, a in rows]
+
+    def history_pager(self, pub_id: int, f: HistoryFilter) -> 'SqliteHistoryPager':
+        return SqliteHistoryPager(self.conn, pub_id, f)
+
+    def history_length(self, pub_id: int) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM history WHERE pub_id = ?', (pub_id,)).fetchone()[0]
+
+    def filter_ids(self, typ: str, stat: str, q: str) -> List[int]:
+        where, params = [], []
+        if typ != 'Sve':
+            where.append('type = ?')
+            params.append(typ)
+        if stat == 'Dostupno':
+            where.append('available = 1')
+        elif stat == 'Posuđeno':
+            where.append('available = 0')
+        elif stat == OVERDUE:
+            condition, overdue_params = overdue_condition(today())
+            where.append(condition)
+            params.extend(overdue_params)
+        if len(q) >= 3:
+            where.append('id IN (SELECT rowid FROM publication_fts WHERE publication_fts MATCH ?)')
+            params.append('"' + q.replace('"', '""') + '"')
+        sql = 'SELECT id, title, author_or_publisher FROM publication'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        rows = self.conn.execute(sql + ' ORDER BY id', params)
+        if not q:
+            return [pid for pid, _, _ in rows]
+        return [pid for pid, title, aop in rows if q in title.lower() or q in aop.lower()]
+
+    # Ids overdue on `day` but not yet on `since` (0: all overdue ones). The
+    # borrow dates between the cutoffs bound the publication_borrowed scan.
+    def overdue_ids(self, day: int, since: int = 0) -> List[int]:
+        condition, params = overdue_condition(day)
+        cutoffs, default = borrow_cutoffs(day)
+        sql = f'SELECT id FROM publication INDEXED BY publication_borrowed WHERE {condition} AND borrow_date < ?'
+        params.append(max([default, *cutoffs.values()]))
+        if since:
+            since_condition, since_params = overdue_condition(since)
+            cutoffs, default = borrow_cutoffs(since)
+            sql += f' AND NOT ({since_condition}) AND borrow_date >= ?'
+            params += since_params + [min([default, *cutoffs.values()])]
+        return [pid for pid, in self.conn.execute(sql + ' ORDER BY id', params)]
+
+    def count_overdue(self, day: int) -> int:
+        terms, params = overdue_terms(day)
+        return self.conn.execute(f'SELECT COALESCE(SUM(n), 0) FROM loan_days WHERE {terms}', params).fetchone()[0]
+
+    def publications(self, with_history: bool = True) -> Iterator[Publication]:
+        rows = self.conn.execute(f'SELECT {COLUMNS} FROM publication ORDER BY id')
+        if not with_history:
+            for row in rows:
+                yield Publication(*row[:5], bool(row[5]), row[6], row[7])
+            return
+        history = self.conn.cursor().execute('SELECT pub_id, user, date, action FROM history ORDER BY pub_id, rowid')
+        entry = next(history, None)
+        for row in rows:
+            pub = Publication(*row[:5], bool(row[5]), row[6], row[7])
+            while entry is not None and entry[0] <= pub.id:
+                if entry[0] == pub.id:
+                    pub.history.add(entry[1], entry[2], entry[3])
+                entry = next(history, None)
+            yield pub
+
+    def counts(self) -> Tuple[int, int]:
+        total, available = self.conn.execute('SELECT total, available FROM counters').fetchone()
+        return total, available
+
+    def import_publications(self, pubs: Iterable[Publication], next_id: int,
+                            progress: Optional[Callable[[int], None]] = None):
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            batch, history, done = [], [], 0
+            for p in pubs:
+                batch.append((p.id, p.type, p.title, p.author_or_publisher, p.year, int(p.available),
+                              p.borrowed_to, p.borrow_date))
+                history.extend((p.id, user, date, action) for user, date, action in p.history.rows())
+                if len(batch) >= IMPORT_BATCH:
+                    done += self._insert_batch(batch, history)
+                    if progress is not None:
+                        progress(done)
+            done += self._insert_batch(batch, history)
+            self._set_next_id(max(next_id, self.next_id))
+        if progress is not None:
+            progress(done)
+
+    def _insert_batch(self, batch: list, history: list) -> int:
+        n = len(batch)
+        self.conn.executemany(f'INSERT INTO publication({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        self.conn.executemany('INSERT INTO history(pub_id, user, date, action) VALUES (?, ?, ?, ?)', history)
+        batch.clear()
+        history.clear()
+        return n
+
+
+# One-off migration of an XML catalogue (or snapshot) into a new database,
+# with the desk actions journaled since its last save replayed first.
+# Returns the database and how many journal records went into it.
+def migrate_catalogue(src_path: str, db_path: str,
+                      progress: Optional[Callable[[float], None]] = None) -> Tuple[SqliteLibrary, int]:
+    if is_snapshot(src_path):
+        pubs, next_id = read_snapshot(src_path, progress)
+    else:
+        pubs, next_id = read_catalogue_parallel(src_path, progress)
+    publications = {pub.id: pub for pub in pubs}
+    next_id, _, records = replay_journal(src_path, publications, next_id)
+    db = SqliteLibrary(db_path)
+    if db.counts()[0]:
+        db.close()
+        raise ValueError('Odabrana baza već sadrži publikacije')
+    db.import_publications(publications.values(), next_id)
+    return db, records
+
+
+class SqliteHistoryPager:
+    # Newest-first pages of one publication's history rows. Each page is one
+    # query on the history_pub index that continues below the last rowid
+    # shown, so a page costs the same however deep into the history it is.
+
+    def __init__(self, conn: sqlite3.Connection, pub_id: int, f: HistoryFilter):
+        self.conn = conn
+        where, params = ['pub_id = ?'], [pub_id]
+        if f.user:
+            where.append('normalise_user(user) = ?')
+            params.append(normalise_user(f.user))
+        if f.action:
+            where.append('action = ?')
+            params.append(f.action.strip())
+        if f.start or f.end:
+            where.append(f"date GLOB '{ISO_DATE}'")
+        if f.start:
+            where.append('date >= ?')
+            params.append(f.start)
+        if f.end:
+            where.append('date <= ?')
+            params.append(f.end)
+        self._where = ' AND '.join(where)
+        self._params = params
+        self._before: Optional[int] = None
+        self.done = False
+
+    def fetch(self, limit: int = HISTORY_PAGE) -> List[Tuple[str, str, str]]:
+        if self.done:
+            return []
+        sql, params = f'SELECT rowid, user, date, action FROM history WHERE {self._where}', list(self._params)
+        if self._before is not None:
+            sql += ' AND rowid < ?'
+            params.append(self._before)
+        rows = self.conn.execute(sql + ' ORDER BY rowid DESC LIMIT ?', params + [limit]).fetchall()
+        if len(rows) < limit:
+            self.done = True
+        if rows:
+            self._before = rows[-1][0]
+        return [(user, date, action) for _, user, date, action in rows]
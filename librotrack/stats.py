@@ -0,0 +1,70 @@
+import os
+from collections import Counter
+from typing import Iterable
+
+# Set LIBROTRACK_DEBUG=1 to recount the catalogue after every status bar
+# update and fail loudly if the maintained counters have drifted.
+DEBUG = bool(os.environ.get('LIBROTRACK_DEBUG'))
+
+
+# Decade of a digit-only year ('1987' -> '1980'); anything else is ''.
+def year_bucket(year: str) -> str:
+    if not year.isdigit():
+        return ''
+    return str(int(year) // 10 * 10)
+
+
+class LibraryStats:
+    # Catalogue counters kept up to date by the desk actions instead of being
+    # recounted: every update is O(1) and so is every read. Only type, year
+    # and availability are looked at, so lazily mapped histories stay mapped.
+
+    def __init__(self, pubs: Iterable = ()):
+        self.rebuild(pubs)
+
+    def rebuild(self, pubs: Iterable):
+        self.total = 0
+        self.available = 0
+        self.by_type = Counter()
+        self.by_type_available = Counter()
+        self.by_year = Counter()
+        for pub in pubs:
+            self.add(pub)
+
+    @property
+    def borrowed(self) -> int:
+        return self.total - self.available
+
+    def add(self, pub):
+        self.total += 1
+        self.by_type[pub.type] += 1
+        self.by_year[year_bucket(pub.year)] += 1
+        if pub.available:
+            self.available += 1
+            self.by_type_available[pub.type] += 1
+
+    def remove(self, pub):
+        self.total -= 1
+        self.by_type[pub.type] -= 1
+        self.by_year[year_bucket(pub.year)] -= 1
+        if pub.available:
+            self.available -= 1
+            self.by_type_available[pub.type] -= 1
+
+    def borrowed_one(self, pub):
+        self.available -= 1
+        self.by_type_available[pub.type] -= 1
+
+    def returned_one(self, pub):
+        self.available += 1
+        self.by_type_available[pub.type] += 1
+
+    def snapshot(self) -> tuple:
+        return (self.total, self.available, +self.by_type, +self.by_type_available, +self.by_year)
+
+    # Full recount for debug mode; raises if any counter disagrees.
+    def verify(self, pubs: Iterable):
+        expected = LibraryStats(pubs).snapshot()
+        actual = self.snapshot()
+        if actual != expected:
+            raise RuntimeError(f'Brojači statistike ne odgovaraju katalogu: {actual} != {expected}')
@@ -0,0 +1,41 @@
+import threading
+from typing import Callable, Optional
+
+
+class BackgroundTask:
+    # Runs `work(task)` on a daemon thread. The worker reports through
+    # report() and polls is_cancelled(); the UI thread polls `progress` and
+    # `done` and reads `result` or `error` once the thread has finished, so no
+    # UI call ever happens off the UI thread.
+
+    def __init__(self, work: Callable[['BackgroundTask'], object]):
+        self.progress = 0.0
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._run, args=(work,), name='librotrack-task', daemon=True)
+
+    def _run(self, work):
+        try:
+            self.result = work(self)
+        except BaseException as e:
+            self.error = e
+
+    def start(self):
+        self._thread.start()
+
+    def report(self, fraction: float):
+        self.progress = fraction
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
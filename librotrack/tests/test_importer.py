@@ -0,0 +1,115 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importer import read_records
+from library import Library
+
+CSV = '''Tip;Naslov;Autor / izdavač;Godina
+knjiga;Zlatarovo zlato;August Šenoa;1871
+Časopis;Modra lasta;Školska knjiga;2026
+;Čuvaj se senjske ruke;August Šenoa;
+DVD;Kekec;Jože Gale;1951
+knjiga;  ;Nepoznat;1900
+knjiga;Priče iz davnine;Ivana Brlić-Mažuranić;tisuću devetsto šesnaesta
+'''
+
+JSONL = '''{"type": "knjiga", "title": "Baltazar", "author_or_publisher": "Sunčana Škrinjarić", "year": 1978}
+
+{"naslov": "Bez tipa"
+["nije", "objekt"]
+{"tip": "časopis", "naslov": "Smib", "izdavač": "Školska knjiga"}
+'''
+
+XML = '''<?xml version='1.0' encoding='utf-8'?>
+<library next_id="40"><publication id="39" type="Casopis"><title>Radost</title>
+<author_or_publisher>Školska knjiga</author_or_publisher><year>1951</year><available>0</available>
+<borrowed_to>Ana Horvat</borrowed_to></publication></library>
+'''
+
+
+class ImporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.library = Library()
+        self.addCleanup(lambda: self.library.close())
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def titles(self):
+        return [(p.id, p.type, p.title, p.author_or_publisher, p.year) for p in self.library.publications.values()]
+
+    def test_csv_with_croatian_headers_and_semicolons(self):
+        report = self.library.import_file(self.write('uvoz.csv', CSV))
+        self.assertEqual(report.added, 3)
+        self.assertEqual(self.titles(), [
+            (1, 'Knjiga', 'Zlatarovo zlato', 'August Šenoa', '1871'),
+            (2, 'Casopis', 'Modra lasta', 'Školska knjiga', '2026'),
+            (3, 'Knjiga', 'Čuvaj se senjske ruke', 'August Šenoa', ''),
+        ])
+        self.assertEqual([(row, reason) for row, reason, _ in report.rejected], [
+            (5, 'Nepoznat tip publikacije: DVD'),
+            (6, 'Naslov ne smije biti prazan'),
+            (7, 'Godina mora sadržavati isključivo brojke'),
+        ])
+        self.assertEqual(report.rejected[0][2]['title'], 'Kekec')
+
+    def test_jsonl_rejects_bad_lines(self):
+        report = self.library.import_file(self.write('uvoz.jsonl', JSONL))
+        self.assertEqual(self.titles(), [
+            (1, 'Knjiga', 'Baltazar', 'Sunčana Škrinjarić', '1978'),
+            (2, 'Casopis', 'Smib', 'Školska knjiga', ''),
+        ])
+        self.assertEqual([row for row, _, _ in report.rejected], [3, 4])
+        self.assertTrue(report.rejected[0][1].startswith('Neispravan JSON'))
+        self.assertEqual(report.rejected[1][1], 'Zapis nije JSON objekt')
+
+    def test_xml_imports_as_new_available_publications(self):
+        self.library.add('Knjiga', 'Zlatarovo zlato', 'August Šenoa', '1871')
+        report = self.library.import_file(self.write('uvoz.xml', XML))
+        self.assertEqual(report.added, 1)
+        pub = self.library.get(2)
+        self.assertEqual((pub.type, pub.title, pub.year, pub.available, pub.borrowed_to),
+                         ('Casopis', 'Radost', '1951', True, ''))
+
+    def test_unsupported_extension(self):
+        with self.assertRaises(ValueError):
+            read_records(self.write('uvoz.txt', CSV))
+
+    def test_rejected_rows_report(self):
+        report = self.library.import_file(self.write('uvoz.csv', CSV))
+        path = os.path.join(self.dir.name, 'odbijeno.csv')
+        report.write(path)
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['redak', 'razlog', 'type', 'title', 'author_or_publisher', 'year'])
+        self.assertEqual(rows[1], ['5', 'Nepoznat tip publikacije: DVD', 'DVD', 'Kekec', 'Jože Gale', '1951'])
+        self.assertEqual(len(rows), 4)
+
+    def test_import_survives_reload(self):
+        catalogue = os.path.join(self.dir.name, 'katalog.xml')
+        self.library.add('Knjiga', 'Zlatarovo zlato', 'August Šenoa', '1871')
+        self.library.save(catalogue)
+        self.library.import_file(self.write('uvoz.csv', CSV))
+        imported = self.titles()
+        self.library.close()
+        self.library = Library()
+        self.library.load(catalogue)
+        self.assertEqual(self.titles(), imported)
+        self.assertEqual(self.library.counts(), (4, 4))
+        self.assertEqual(self.library.filter('Sve', 'Sve', 'senjske'), [4])
+        self.assertEqual(self.library.add('Knjiga', 'Baltazar', 'Sunčana Škrinjarić', '1978').id, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
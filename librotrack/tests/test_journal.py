@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import commit_staged_journal
+from library import Library
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'katalog.xml')
+        self.library = Library()
+        self.pub = self.library.add('Knjiga', 'Zlatarovo zlato', 'August Šenoa', '1871')
+        self.library.save(self.path)
+
+    def tearDown(self):
+        self.library.close()
+        self.dir.cleanup()
+
+    def test_migrate_replays_journal(self):
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        self.library.close()
+        self.library.migrate(self.path, os.path.join(self.dir.name, 'katalog.db'))
+        pub = self.library.get(self.pub.id, with_history=True)
+        self.assertFalse(pub.available)
+        self.assertEqual(pub.borrowed_to, 'Ana Horvat')
+
+    def test_desk_actions_during_migration_reach_database(self):
+        db_path = os.path.join(self.dir.name, 'katalog.db')
+        records = Library.write_database(self.path, db_path)
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        added = self.library.add('Casopis', 'Modra lasta', 'Školska knjiga', '2026')
+        self.library.finish_migration(self.path, db_path, records)
+        self.assert_loan_and_addition(self.library, added.id)
+        self.assertEqual(self.library.add('Knjiga', 'Čuvaj se senjske ruke', 'August Šenoa', '1876').id,
+                         added.id + 1)
+
+    def test_desk_actions_during_load_survive_install(self):
+        loaded = Library.read(self.path)
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        added = self.library.add('Casopis', 'Modra lasta', 'Školska knjiga', '2026')
+        self.library.install(loaded)
+        self.assert_loan_and_addition(self.library, added.id)
+        self.library.close()
+        reopened = Library()
+        reopened.load(self.path)
+        self.addCleanup(reopened.close)
+        self.assert_loan_and_addition(reopened, added.id)
+
+    def assert_loan_and_addition(self, library: Library, added_id: int):
+        self.assertEqual(library.get(self.pub.id).borrowed_to, 'Ana Horvat')
+        self.assertEqual(library.get(added_id).title, 'Modra lasta')
+        self.assertEqual(library.counts(), (2, 1))
+        self.assertEqual(library.filter('Sve', 'Posuđeno', ''), [self.pub.id])
+
+    def test_desk_actions_during_save_survive_crash_before_journal_rename(self):
+        saving = self.library.begin_save()
+        self.library.write_save(saving, self.path)
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        added = self.library.add('Casopis', 'Modra lasta', 'Školska knjiga', '2026')
+        with mock.patch('library.commit_staged_journal', side_effect=OSError(5, 'Input/output error')):
+            with self.assertRaises(OSError):
+                self.library.end_save(saving, self.path)
+        self.library.close()
+        reopened = Library()
+        reopened.load(self.path)
+        self.addCleanup(reopened.close)
+        self.assert_loan_and_addition(reopened, added.id)
+        self.assertFalse(os.path.exists(self.path + '.journal.next'))
+
+    def test_desk_actions_after_save_survive_reload(self):
+        open_at_rename = []
+
+        def commit(path):
+            open_at_rename.append(self.library.journal)
+            commit_staged_journal(path)
+
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        with mock.patch('library.commit_staged_journal', side_effect=commit):
+            self.library.save(self.path)
+        self.assertEqual(open_at_rename, [None])
+        self.library.return_publication(self.pub.id, '2026-01-19')
+        self.library.borrow(self.pub.id, 'Ivo Kovač', '2026-01-20')
+        self.library.close()
+        reopened = Library()
+        reopened.load(self.path)
+        self.addCleanup(reopened.close)
+        pub = reopened.get(self.pub.id)
+        self.assertEqual(pub.borrowed_to, 'Ivo Kovač')
+        self.assertEqual(len(pub.history), 3)
+
+    @unittest.skipIf(os.name == 'nt', 'POSIX permissions')
+    def test_save_keeps_file_mode(self):
+        os.chmod(self.path, 0o664)
+        self.library.borrow(self.pub.id, 'Ana Horvat', '2026-01-05')
+        self.library.save(self.path)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o664)
+
+    def test_failed_fsync_raises_instead_of_hanging(self):
+        errors = []
+
+        def borrow():
+            try:
+                self.library.borrow(self.pub.id, 'Ana Horvat')
+            except OSError as e:
+                errors.append(e)
+
+        with mock.patch('os.fsync', side_effect=OSError(5, 'Input/output error')):
+            worker = threading.Thread(target=borrow, daemon=True)
+            worker.start()
+            worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([e.errno for e in errors], [5])
+        with self.assertRaises(OSError):
+            self.library.return_publication(self.pub.id)
+
+
+if __name__ == '__main__':
+    unittest.main()
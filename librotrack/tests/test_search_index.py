@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library import Library, matches
+
+WORDS = ('Šenoa', 'Đurđa', 'čvor', 'ćup', 'žaba', 'more', 'grad', 'Zagreb', 'zvijezda', 'Dubrovnik', 'šuma',
+         'SUNCE', 'kuća', 'Ivana', 'Brlić', 'Mažuranić', 'dom')
+TYPES = ('Knjiga', 'Casopis')
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rnd = random.Random(11)
+        self.library = Library()
+        self.addCleanup(self.library.close)
+
+    def text(self, n: int) -> str:
+        return ' '.join(self.rnd.choice(WORDS) for _ in range(n))
+
+    def queries(self):
+        yield ''
+        for word in WORDS:
+            lowered = word.lower()
+            yield lowered
+            yield lowered[1:4]
+            yield lowered[:2]
+        yield 'senoa'
+        yield 'durda'
+        yield 'a z'
+        yield 'nema toga'
+
+    # The index has to give exactly what a scan with matches() gives, in
+    # catalogue order.
+    def assert_same_as_scan(self):
+        library = self.library
+        for typ in ('Sve',) + TYPES:
+            for stat in ('Sve', 'Dostupno', 'Posuđeno'):
+                for q in self.queries():
+                    expected = [pid for pid, pub in library.publications.items() if matches(pub, typ, stat, q)]
+                    self.assertEqual(library.filter(typ, stat, q), expected, (typ, stat, q))
+
+    def test_filter_matches_scan(self):
+        rnd, library = self.rnd, self.library
+        ids = [library.add(rnd.choice(TYPES), self.text(3), self.text(2), '2000').id for _ in range(3000)]
+        for pid in rnd.sample(ids, 1000):
+            library.borrow(pid, 'Ana Horvat', '2026-01-05')
+        self.assert_same_as_scan()
+        # Enough deletions to make the index compact itself.
+        deleted = rnd.sample(ids, 2000)
+        for pid in deleted:
+            library.delete(pid)
+        for pid in rnd.sample(sorted(set(ids) - set(deleted)), 300):
+            if library.get(pid).available:
+                library.borrow(pid, 'Ivo Kovač', '2026-02-01')
+            else:
+                library.return_publication(pid, '2026-02-01')
+        for _ in range(200):
+            library.add(rnd.choice(TYPES), self.text(2), self.text(1), '2026')
+        self.assert_same_as_scan()
+
+
+if __name__ == '__main__':
+    unittest.main()
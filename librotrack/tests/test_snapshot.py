@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library import Library
+from models import History, Publication
+from snapshot import SNAPSHOT_EXT, MappedHistory, read_snapshot, release_snapshot, write_snapshot
+from xml_io import read_catalogue, write_catalogue
+
+
+def fields(pub: Publication):
+    return (pub.id, pub.type, pub.title, pub.author_or_publisher, pub.year, pub.available, pub.borrowed_to,
+            pub.borrow_date, list(pub.history.rows()))
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        history = History()
+        history.add('Ana Horvat', '2026-01-05', 'posudba')
+        history.add('Ana Horvat', '2026-01-19', 'vraćanje')
+        history.add('Ivo Kovač', '5. 2. 2026.', 'posudba')
+        history.add('', '', 'rezervacija')
+        history.add('Marija Babić', '2026-02-30', 'otpis')
+        self.pubs = [
+            Publication(1, 'Knjiga', 'Zlatarovo zlato', 'August Šenoa', '1871', False, 'Ivo Kovač', '5. 2. 2026.',
+                        history),
+            Publication(2, 'Casopis', 'Modra lasta', 'Školska knjiga', '2026'),
+            Publication(5, 'Knjiga', 'Čuvaj se senjske ruke', 'August Šenoa', '1876'),
+        ]
+        xml = os.path.join(self.dir.name, 'katalog.xml')
+        write_catalogue(xml, self.pubs, 7)
+        pubs, next_id = read_catalogue(xml)
+        self.path = os.path.join(self.dir.name, 'katalog' + SNAPSHOT_EXT)
+        write_snapshot(self.path, pubs, next_id)
+
+    def test_eager_load_matches_catalogue(self):
+        pubs, next_id = read_snapshot(self.path)
+        self.assertEqual(next_id, 7)
+        self.assertEqual([fields(p) for p in pubs], [fields(p) for p in self.pubs])
+
+    def test_lazy_load_matches_eager_load(self):
+        eager, _ = read_snapshot(self.path)
+        lazy, next_id = read_snapshot(self.path, lazy_history=True)
+        self.assertEqual(next_id, 7)
+        self.assertIsInstance(lazy[0].history, MappedHistory)
+        for e, p in zip(eager, lazy):
+            self.assertEqual(len(p.history), len(e.history))
+            self.assertEqual(list(p.history.borrow_entries()), list(e.history.borrow_entries()))
+            self.assertEqual([p.history.row(i) for i in range(len(p.history))], list(e.history.rows()))
+        self.assertEqual([fields(p) for p in lazy], [fields(p) for p in eager])
+
+    def test_decoded_lazy_history_appends(self):
+        pubs, _ = read_snapshot(self.path, lazy_history=True)
+        history = pubs[0].history
+        history.add('Ana Horvat', '2026-03-01', 'posudba')
+        self.assertEqual(len(history), 6)
+        self.assertEqual(history.row(5), ('Ana Horvat', '2026-03-01', 'posudba'))
+        self.assertEqual(history.row(4), ('Marija Babić', '2026-02-30', 'otpis'))
+
+    # Windows refuses to replace a mapped file; where /proc shows the
+    # mappings, check that the file is let go of.
+    def test_release_keeps_undecoded_histories(self):
+        eager, _ = read_snapshot(self.path)
+        lazy, _ = read_snapshot(self.path, lazy_history=True)
+        self.assertIn(mapped(self.path), (True, None))
+        release_snapshot(self.path)
+        self.assertIn(mapped(self.path), (False, None))
+        self.assertEqual(lazy[0].history.row(2), eager[0].history.row(2))
+        self.assertEqual([fields(p) for p in lazy], [fields(p) for p in eager])
+
+    def test_lazy_load_saves_in_place(self):
+        library = Library()
+        self.addCleanup(library.close)
+        library.load(self.path)
+        self.assertIsInstance(library.get(1).history, MappedHistory)
+        self.assertIn(mapped(self.path), (True, None))
+        library.borrow(2, 'Ana Horvat', '2026-03-01')
+        library.save(self.path, snapshot=True)
+        self.assertIn(mapped(self.path), (False, None))
+        self.assertEqual(fields(library.get(1)), fields(self.pubs[0]))
+        library.close()
+        reopened = Library()
+        self.addCleanup(reopened.close)
+        reopened.load(self.path)
+        self.assertEqual(fields(reopened.get(1)), fields(self.pubs[0]))
+        self.assertEqual(reopened.get(2).borrowed_to, 'Ana Horvat')
+        self.assertEqual(len(reopened.get(2).history), 1)
+
+
+def mapped(path: str):
+    try:
+        with open('/proc/self/maps', encoding='utf-8', errors='replace') as f:
+            maps = f.read()
+    except OSError:
+        return None
+    return os.path.realpath(path) in maps
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loans import is_overdue
+from models import Publication
+from sqlite_store import SqliteLibrary
+
+DAY = datetime.date(2026, 3, 1).toordinal()
+TYPES = ('Knjiga', 'Casopis', 'Ostalo')
+
+
+class CountersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'katalog.db')
+        self.db = SqliteLibrary(self.path)
+        self.addCleanup(lambda: self.db.close())
+        self.rnd = random.Random(3)
+
+    def date(self) -> str:
+        return self.rnd.choice([datetime.date.fromordinal(DAY - self.rnd.randint(0, 40)).isoformat(), '1. 2. 2026.'])
+
+    def assert_counts(self):
+        pubs = list(self.db.publications(with_history=False))
+        self.assertEqual(self.db.counts(), (len(pubs), sum(p.available for p in pubs)))
+        for day in (DAY, DAY + 10):
+            overdue = [p.id for p in pubs if is_overdue(p, day)]
+            self.assertEqual(self.db.count_overdue(day), len(overdue))
+            self.assertEqual(self.db.overdue_ids(day), overdue)
+        self.assertEqual(self.db.overdue_ids(DAY + 10, DAY),
+                         [p.id for p in pubs if is_overdue(p, DAY + 10) and not is_overdue(p, DAY)])
+
+    def test_counters_follow_every_change(self):
+        rnd = self.rnd
+        pubs = [Publication(i, rnd.choice(TYPES), f'Naslov {i}', 'Autor', '2000') for i in range(1, 201)]
+        for p in pubs[::3]:
+            p.available, p.borrowed_to, p.borrow_date = False, 'Ana Horvat', self.date()
+        self.db.import_publications(pubs, 201)
+        self.assert_counts()
+        for _ in range(300):
+            pid = rnd.randint(1, self.db.next_id)
+            choice = rnd.random()
+            if choice < 0.4:
+                self.db.borrow(pid, 'Ivo Kovač', self.date())
+            elif choice < 0.8:
+                self.db.return_publication(pid, '2026-03-01')
+            elif choice < 0.9:
+                self.db.delete(pid)
+            else:
+                self.db.add(rnd.choice(TYPES), 'Novi naslov', 'Autor', '2026')
+        self.assert_counts()
+
+    def test_database_without_counters_is_counted_on_open(self):
+        pubs = [Publication(i, TYPES[i % 3], f'Naslov {i}', 'Autor', '2000') for i in range(1, 31)]
+        for p in pubs[::2]:
+            p.available, p.borrowed_to, p.borrow_date = False, 'Ana Horvat', self.date()
+        self.db.import_publications(pubs, 31)
+        self.db.close()
+        conn = sqlite3.connect(self.path)
+        conn.executescript('DELETE FROM counters; DELETE FROM loan_days;')
+        conn.close()
+        self.db = SqliteLibrary(self.path)
+        self.assert_counts()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import tkinter as tk
+from bisect import bisect_left
+from tkinter import ttk
+from typing import Callable, List, Optional
+
+
+class VirtualTreeview(ttk.Frame):
+    # Only the rows inside the viewport (plus a small overscan) exist as Tk items.
+    # The full result lives in `items` as a sequence of publication ids and the
+    # scrollbar is mapped onto it, so refresh and scroll cost does not depend on
+    # how many rows the filter returned. Item iids are the publication ids.
+
+    def __init__(self, master, columns, row_values: Callable[[int], tuple], overscan: int = 3,
+                 row_tags: Optional[Callable[[int], tuple]] = None, **kw):
+        super().__init__(master)
+        self.row_values = row_values
+        self.row_tags = row_tags or (lambda pid: ())
+        self.overscan = overscan
+        self.items: List[int] = []
+        self.offset = 0
+        self.selected_id: Optional[int] = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='browse', **kw)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', lambda e: self.render())
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(1, 'units'))
+        self.tree.bind('<Up>', lambda e: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self.move_selection(-self.visible_rows()))
+        self.tree.bind('<Next>', lambda e: self.move_selection(self.visible_rows()))
+        self.tree.bind('<Home>', lambda e: self.move_selection(-len(self.items)))
+        self.tree.bind('<End>', lambda e: self.move_selection(len(self.items)))
+
+    def set_items(self, items: List[int]):
+        self.items = items
+        if self.selected_id is not None and self.selected_id not in items:
+            self.selected_id = None
+        self.render()
+
+    def visible_rows(self) -> int:
+        height = self.tree.winfo_height()
+        rowheight = int(ttk.Style(self).lookup(self.tree.cget('style') or 'Treeview', 'rowheight') or 20)
+        if height <= 1:
+            return int(self.tree.cget('height'))
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else ''
+        top = bbox[1] if bbox else rowheight
+        return max(1, (height - top) // rowheight)
+
+    def clamp(self, offset: int) -> int:
+        return max(0, min(offset, len(self.items) - self.visible_rows()))
+
+    def render(self):
+        tree = self.tree
+        self.offset = self.clamp(self.offset)
+        window = self.items[self.offset:self.offset + self.visible_rows() + self.overscan]
+        tree.delete(*tree.get_children())
+        for pid in window:
+            tree.insert('', tk.END, iid=str(pid), values=self.row_values(pid), tags=self.row_tags(pid))
+        if self.selected_id is not None and tree.exists(str(self.selected_id)):
+            tree.selection_set(str(self.selected_id))
+        self.update_scrollbar()
+
+    # Row-level update for a single publication. `items` is ordered by `key`, so
+    # the row is found by bisection; `visible` says whether it passes the
+    # current filter. Only rows inside the rendered window touch Tk.
+    def update_item(self, pid: int, visible: bool, key: Callable[[int], object]):
+        items = self.items
+        pos = bisect_left(items, key(pid), key=key)
+        present = pos < len(items) and items[pos] == pid
+        if visible and present:
+            if self.tree.exists(str(pid)):
+                self.tree.item(str(pid), values=self.row_values(pid), tags=self.row_tags(pid))
+            return
+        if visible:
+            items.insert(pos, pid)
+        elif present:
+            del items[pos]
+            if pid == self.selected_id:
+                self.selected_id = None
+        else:
+            return
+        if pos < self.offset:
+            self.offset += 1 if visible else -1
+            self.update_scrollbar()
+        elif pos < self.offset + self.visible_rows() + self.overscan:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def update_scrollbar(self):
+        n = len(self.items)
+        if not n:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.offset / n, min(1.0, (self.offset + self.visible_rows()) / n))
+
+    def scroll(self, amount: int, what: str = 'units'):
+        if what.startswith('page'):
+            amount *= self.visible_rows()
+        offset = self.clamp(self.offset + amount)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return 'break'
+
+    def on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            offset = self.clamp(int(float(args[0]) * len(self.items)))
+            if offset != self.offset:
+                self.offset = offset
+                self.render()
+        elif action == 'scroll':
+            self.scroll(int(args[0]), args[1])
+
+    def on_select(self, event=None):
+        sel = self.tree.selection()
+        if sel:
+            self.selected_id = int(sel[0])
+
+    def index_of(self, pid: int) -> Optional[int]:
+        iid = str(pid)
+        if self.tree.exists(iid):
+            return self.offset + self.tree.index(iid)
+        return None
+
+    def move_selection(self, delta: int):
+        if not self.items:
+            return 'break'
+        current = self.index_of(self.selected_id) if self.selected_id is not None else None
+        if current is None:
+            pos = self.offset
+        else:
+            pos = max(0, min(current + delta, len(self.items) - 1))
+        visible = self.visible_rows()
+        if pos < self.offset:
+            self.offset = pos
+        elif pos >= self.offset + visible:
+            self.offset = pos - visible + 1
+        self.selected_id = self.items[pos]
+        self.render()
+        self.tree.focus(str(self.selected_id))
+        return 'break'
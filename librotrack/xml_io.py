@@ -0,0 +1,212 @@
+import io
+import mmap
+import os
+from array import array
+from itertools import accumulate
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from atomic import atomic_write
+from models import ACTIONS, ODD_DATES, USERS, History, Publication, day_number, reset_pools
+
+# ElementTree is imported by the functions that parse or write, so the core
+# does not load it until a catalogue is read or saved.
+
+PROGRESS_EVERY = 2000
+WRITE_BUFFER = 1 << 20
+# A save fsyncs what it has written every this many publications, so the
+# file never has much unwritten data for a journal fsync to wait behind.
+SYNC_EVERY = 5000
+PARALLEL_MIN_BYTES = 32 << 20
+CHUNKS_PER_WORKER = 4
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+# Streams <publication> elements with iterparse and drops each one as soon as
+# it has been converted, so the XML tree never exists in memory as a whole.
+# `progress` receives the fraction of the file read so far; `cancelled` is
+# polled at the same points and aborts the load with LoadCancelled.
+def read_catalogue(path: str,
+                   progress: Optional[Callable[[float], None]] = None,
+                   cancelled: Optional[Callable[[], bool]] = None) -> Tuple[List[Publication], int]:
+    import xml.etree.ElementTree as ET
+    pubs = []
+    next_id = 1
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as f:
+        root = None
+        for event, el in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = el
+                    next_id = int(el.attrib.get('next_id', '1'))
+                continue
+            if el.tag != 'publication':
+                continue
+            pubs.append(Publication.from_xml_element(el))
+            root.clear()
+            if len(pubs) % PROGRESS_EVERY == 0:
+                if cancelled is not None and cancelled():
+                    raise LoadCancelled()
+                if progress is not None:
+                    progress(f.tell() / size)
+    if progress is not None:
+        progress(1.0)
+    return pubs, next_id
+
+
+# Writes one <publication> at a time through atomic_write, so the previous
+# file is only ever replaced by a complete one.
+def write_catalogue(path: str, pubs: Iterable[Publication], next_id: int, total: int = 0,
+                    progress: Optional[Callable[[float], None]] = None):
+    import xml.etree.ElementTree as ET
+    with atomic_write(path, 'w', encoding='utf-8', errors='xmlcharrefreplace', buffering=WRITE_BUFFER) as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        f.write(f'<library next_id="{int(next_id)}">')
+        for n, p in enumerate(pubs, 1):
+            f.write(ET.tostring(p.to_xml_element(), encoding='unicode'))
+            if progress is not None and total and n % PROGRESS_EVERY == 0:
+                progress(n / total)
+            if n % SYNC_EVERY == 0:
+                f.flush()
+                os.fsync(f.fileno())
+        f.write('</library>')
+    if progress is not None:
+        progress(1.0)
+
+
+# Splits the file at <publication> start tags and parses the pieces in a
+# process pool. Pieces are merged back in file order, so the result is the
+# same list and next_id that read_catalogue returns. Small files, single-core
+# machines and files with a DOCTYPE (whose entities a piece would not see)
+# take the serial path.
+def read_catalogue_parallel(path: str,
+                            progress: Optional[Callable[[float], None]] = None,
+                            cancelled: Optional[Callable[[], bool]] = None,
+                            workers: Optional[int] = None,
+                            min_bytes: int = PARALLEL_MIN_BYTES) -> Tuple[List[Publication], int]:
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or os.path.getsize(path) < min_bytes:
+        return read_catalogue(path, progress, cancelled)
+    split = _split_catalogue(path, workers * CHUNKS_PER_WORKER)
+    if split is None:
+        return read_catalogue(path, progress, cancelled)
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    prolog, next_id, ranges = split
+    results = [None] * len(ranges)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        pending = {pool.submit(_parse_range, path, start, end, prolog): i for i, (start, end) in enumerate(ranges)}
+        done = 0
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[pending.pop(future)] = future.result()
+                done += 1
+            if cancelled is not None and cancelled():
+                pool.shutdown(cancel_futures=True)
+                raise LoadCancelled()
+            if progress is not None:
+                progress(0.9 * done / len(ranges))
+    pubs = []
+    for result in results:
+        pubs.extend(_merge_pieces(*result))
+    if progress is not None:
+        progress(1.0)
+    return pubs, next_id
+
+
+# Workers are started from a clean process, never forked from this one: a
+# load runs on a worker thread of the Tk process, and forking a threaded
+# process can copy locks held by other threads.
+def _pool_context():
+    import multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# Returns the XML declaration, next_id and byte ranges that each hold whole
+# <publication> elements, or None when the file cannot be split safely.
+def _split_catalogue(path: str, pieces: int):
+    import xml.etree.ElementTree as ET
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        first = _find_publication(data, 0)
+        if first < 0:
+            return None
+        head = data[:first]
+        if b'<!DOCTYPE' in head:
+            return None
+        prolog = head[:head.index(b'?>') + 2] if head.startswith(b'<?xml') else b''
+        parser = ET.XMLPullParser(events=('start',))
+        parser.feed(head)
+        root = next(el for _, el in parser.read_events())
+        next_id = int(root.attrib.get('next_id', '1'))
+        end = data.rfind(b'</' + root.tag.encode('utf-8'))
+        if end < first:
+            return None
+        bounds = [first]
+        step = (end - first) // pieces
+        for k in range(1, pieces):
+            pos = _find_publication(data, max(first + k * step, bounds[-1] + 1))
+            if pos < 0 or pos >= end:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(end)
+        return prolog, next_id, list(zip(bounds, bounds[1:]))
+
+
+def _find_publication(data, pos: int) -> int:
+    while True:
+        pos = data.find(b'<publication', pos)
+        if pos < 0 or data[pos + 12:pos + 13] in (b' ', b'>', b'/', b'\t', b'\n', b'\r'):
+            return pos
+        pos += 1
+
+
+# Runs in a worker. History values come back as the worker's pool ids
+# together with its pools, since pool ids are only meaningful per process.
+# The pools are started afresh for each range, so a worker that parses
+# several ranges returns only the strings of the current one.
+def _parse_range(path: str, start: int, end: int, prolog: bytes):
+    import xml.etree.ElementTree as ET
+    reset_pools()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        body = f.read(end - start)
+    fields = []
+    counts = array('I')
+    users, days, actions = array('I'), array('i'), array('H')
+    source = io.BytesIO(prolog + b'<library>' + body + b'</library>')
+    root = None
+    for event, el in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = el
+            continue
+        if el.tag != 'publication':
+            continue
+        p = Publication.from_xml_element(el)
+        root.clear()
+        fields.append((p.id, p.type, p.title, p.author_or_publisher, p.year, p.available,
+                       p.borrowed_to, p.borrow_date))
+        counts.append(len(p.history))
+        users.extend(p.history.users)
+        days.extend(p.history.days)
+        actions.extend(p.history.actions)
+    return fields, counts, users, days, actions, USERS.strings, ODD_DATES.strings, ACTIONS.strings
+
+
+def _merge_pieces(fields, counts, users, days, actions, user_pool, odd_pool, action_pool) -> List[Publication]:
+    user_ids = [USERS.id(s) for s in user_pool]
+    users = array('I', map(user_ids.__getitem__, users))
+    action_ids = [ACTIONS.id(s) for s in action_pool]
+    actions = array('H', map(action_ids.__getitem__, actions))
+    if odd_pool:
+        days = array('i', (d if d >= 0 else day_number(odd_pool[-1 - d]) for d in days))
+    pubs = []
+    for row, end, n in zip(fields, accumulate(counts), counts):
+        start = end - n
+        pubs.append(Publication(*row, History.from_columns(users[start:end], days[start:end], actions[start:end])))
+    return pubs